@@ -0,0 +1,45 @@
+import sys, os, time
+import numpy as np
+from astropy.io import fits
+
+# Accès aux modules de l'interface (fond.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'interface'))
+from fond import MOTEURS_FOND, calculerFond
+
+# ==========================================================================
+# BENCHMARK : MOTEURS DE FOND (IMAGE SANS ÉTOILES)
+# Rapport précision / vitesse des moteurs approchés par rapport au
+# filtre médian exact, pour plusieurs tailles de filtre d'étoiles
+# ==========================================================================
+
+fits_file = './examples/HorseHead.fits'
+taillesFiltre = [9, 25, 51]
+
+with fits.open(fits_file) as hdul:
+    image = hdul[0].data.astype(np.float32)
+
+# Dynamique de référence pour exprimer les erreurs en pourcentage
+dynamique = np.percentile(image, 99.9) - np.percentile(image, 0.1)
+
+print(f"Image {fits_file} : {image.shape[1]}x{image.shape[0]}, dynamique (p0.1-p99.9) = {dynamique:.1f}")
+
+for taille in taillesFiltre:
+
+    print(f"\n--- Filtre d'étoiles = {taille} ---")
+    print(f"{'moteur':>30} | {'durée (s)':>9} | {'accélération':>12} | {'RMSE':>9} | {'RMSE (%)':>8} | {'erreur max':>10}")
+
+    fondsCalcules = {}
+    durees = {}
+
+    for moteur in MOTEURS_FOND:
+        debut = time.perf_counter()
+        fondsCalcules[moteur] = calculerFond(image, taille, moteur, nbTravailleurs=os.cpu_count() or 1).astype(np.float64)
+        durees[moteur] = time.perf_counter() - debut
+
+    reference = fondsCalcules['exact']
+
+    for moteur, description in MOTEURS_FOND.items():
+        ecart = fondsCalcules[moteur] - reference
+        rmse = np.sqrt(np.mean(ecart ** 2))
+        print(f"{description:>30} | {durees[moteur]:>9.3f} | {durees['exact'] / durees[moteur]:>11.1f}x | "
+              f"{rmse:>9.2f} | {100 * rmse / dynamique:>8.3f} | {np.max(np.abs(ecart)):>10.1f}")
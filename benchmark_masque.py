@@ -0,0 +1,53 @@
+import sys, os, time
+import numpy as np
+
+# Accès aux modules de l'interface (masque.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'interface'))
+from masque import rasteriserMasque
+
+# ==========================================================================
+# BENCHMARK : RASTERISATION DU MASQUE D'ÉTOILES
+# Compare la boucle Python historique (un disque par étoile) au tamponnage
+# vectorisé de masque.py, pour un nombre croissant d'étoiles détectées
+# ==========================================================================
+
+forme = (4096, 4096)  # Taille image (hauteur, largeur)
+rayon = 4             # Rayon étoiles (valeur par défaut du modèle)
+nombresEtoiles = [100, 1000, 10000, 50000, 100000, 200000]
+
+def masqueBoucle(forme, xs, ys, rayon):
+    """Version d'origine de Modele.genererImages : une écriture np.ogrid par étoile"""
+    mask = np.zeros(forme, dtype=int)
+    for x, y in zip(xs, ys):
+        y = int(y) ; x = int(x)
+        y_min = max(y-rayon, 0) ; y_max = min(y+rayon+1, mask.shape[0])
+        x_min = max(x-rayon, 0) ; x_max = min(x+rayon+1, mask.shape[1])
+        yy, xx = np.ogrid[y_min:y_max, x_min:x_max]
+        circle = (yy - y)**2 + (xx - x)**2 <= rayon**2
+        mask[y_min:y_max, x_min:x_max][circle] = 1
+    return mask
+
+def chronometrer(fonction, *args):
+    """Retourne le résultat et la meilleure durée sur 3 exécutions"""
+    durees = []
+    for _ in range(3):
+        debut = time.perf_counter()
+        resultat = fonction(*args)
+        durees.append(time.perf_counter() - debut)
+    return resultat, min(durees)
+
+rng = np.random.default_rng(0)
+
+print(f"Image {forme[1]}x{forme[0]}, rayon {rayon}")
+print(f"{'étoiles':>10} | {'boucle (s)':>11} | {'vectorisé (s)':>13} | {'accélération':>12} | identique")
+
+for n in nombresEtoiles:
+    # Centres aléatoires, y compris sur les bords pour tester le découpage des disques
+    xs = rng.uniform(0, forme[1], n)
+    ys = rng.uniform(0, forme[0], n)
+
+    masqueReference, dureeBoucle = chronometrer(masqueBoucle, forme, xs, ys, rayon)
+    masqueVectorise, dureeVectorise = chronometrer(rasteriserMasque, forme, xs, ys, rayon)
+
+    identique = masqueReference.dtype == masqueVectorise.dtype and np.array_equal(masqueReference, masqueVectorise)
+    print(f"{n:>10} | {dureeBoucle:>11.4f} | {dureeVectorise:>13.4f} | {dureeBoucle / dureeVectorise:>11.1f}x | {identique}")
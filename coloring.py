@@ -1,7 +1,11 @@
 import numpy as np
 from astropy.io import fits
 import matplotlib.pyplot as plt
-import sys 
+import sys, os
+
+# Accès aux modules de l'interface (etirement.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'interface'))
+from etirement import etirerImage
 
 fits_path = "./examples/test_M31_linear.fits"
 output_png = "./results/image_multicanal.png"
@@ -19,15 +23,8 @@ blue = float(sys.argv[3])
 with fits.open(fits_path) as hdul:
     img = hdul[0].data.astype(np.float32)
 
-# Normalisation par canal -> [0, 1]
-img_norm = np.zeros_like(img) 
-for c in range(img.shape[0]): 
-    cmin = np.min(img[c]) 
-    cmax = np.max(img[c]) 
-    img_norm[c] = (img[c] - cmin) / (cmax - cmin)
-
-# Étirement asinh
-img_stretched = np.arcsinh(stretch_factor * img_norm) / np.arcsinh(stretch_factor)
+# Normalisation par canal -> [0, 1] puis étirement asinh (module d'étirement partagé avec l'interface)
+img_stretched = np.stack([etirerImage(img[c], 'asinh', facteur=stretch_factor) for c in range(img.shape[0])])
 
 # Réorganisation pour matplotlib 
 # (H, W, C)
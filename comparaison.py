@@ -1,9 +1,14 @@
+import sys, os
 import numpy as np
 from astropy.io import fits
 import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
 from matplotlib.pyplot import imread
 
+# Accès aux modules de l'interface (etirement.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'interface'))
+from etirement import etirerImage
+
 
 # Charger l'image FITS
 hdu = fits.open('./examples/test_M31_linear.fits')[0]
@@ -28,9 +33,8 @@ elif data.ndim > 3:
 
 def normalize_image(img):
     """Normalise une image entre 0 et 1 en utilisant les percentiles pour éviter les valeurs extrêmes"""
-    img = img - np.percentile(img, 1)  # Soustrait le 1er percentile (fond sombre)
-    img = img / np.percentile(img, 99)  # Divise par le 99e percentile (évite les pixels saturés)
-    return np.clip(img, 0, 1)
+    # Entre 1er percentile (fond sombre) et 99e percentile (évite les pixels saturés), percentiles lus sur histogramme
+    return etirerImage(img, 'percentile', bas=1, haut=99)
 
 # Normaliser les images pour la comparaison
 data_normalized = normalize_image(data)
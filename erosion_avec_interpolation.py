@@ -1,86 +1,59 @@
-from astropy.io import fits
 import matplotlib.pyplot as plt
-import cv2 as cv
-import numpy as np
+import sys, os
+
+# Accès aux modules de l'interface (morphologie.py : chargement, normalisation, érosion et mélange partagés)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'interface'))
+from morphologie import chargerImageErosion, normaliserCanaux, creerNoyauErosion, eroderImage, eroderEtoiles, masqueEtoilesOtsu, melangerErosion, enregistrerPng
 
 # FITS, format standard en astronomie (images, et données precises)
 fits_file = './examples/test_M31_linear.fits'
-hdul = fits.open(fits_file)  # hdul = HDU List (liste des unités de données)
 
-hdul.info() # affiche les informations hdu
+# Paramètres de l'érosion
+# Le noyau 3x3 détermine la forme et la taille de l'opération morphologique
+forme_noyau = 'rectangle' # 'rectangle', 'ellipse' ou 'croix'
+taille_noyau = 3
+profondeur = 'uint16' # 'uint8', 'uint16' ou 'float32' : érosion sans quantification 8 bits (dynamique des données FITS conservée)
+selectif = True # Érosion limitée aux boîtes des étoiles du masque (nébulosité hors étoiles non traitée)
 
-# Accéder aux données du HDU principal
-# HDU, chaqueHDU contient des données et métadonnées
-# hdul[0] = HDU primaire qui contient l'image
-data = hdul[0].data
+# Chargement (image couleur en hauteur, largeur, canaux)
+data = chargerImageErosion(fits_file)
 
-# Accéder aux métadonnées : taille, coordonnées, instrument et autres
-header = hdul[0].header
+# Normaliser chaque canal séparément à [0, niveau max de profondeur] pour OpenCV
+image = normaliserCanaux(data, profondeur=profondeur)
+kernel = creerNoyauErosion(forme_noyau, taille_noyau)
 
 # Gérer les images monochromes et couleur
 # ndim = nombre de dimensions (2D = monochrome, 3D = couleur)
 if data.ndim == 3: # Image couleur (3 dimensions)
-    # Les données FITS peuvent avoir les canaux de couleur en première dimension
-    if data.shape[0] == 3:  # vérifie la dimension avant utilisation
-        data = np.transpose(data, (1, 2, 0))  # Changement en hauteur, largeur, canaux
-    
     # Normaliser image à [0, 1] pour matplotlib
     # Évite les gros nombres et les bugs associés avec le format [0, 1]
     data_normalized = (data - data.min()) / (data.max() - data.min())
-    
+
     # Sauvegarder les données comme image png
     plt.imsave('./results/original.png', data_normalized)
-    
-    # Normaliser chaque canal séparément à [0, 255] pour OpenCV
-    image = np.zeros_like(data, dtype='uint8')
-    for i in range(data.shape[2]):
-        channel = data[:, :, i]
-        image[:, :, i] = ((channel - channel.min()) / (channel.max() - channel.min()) * 255).astype('uint8')
-else:
-    # Image monochrome 2D
-    data_normalized = (data - data.min()) / (data.max() - data.min()) 
-    plt.imsave('./results/original.png', data_normalized, cmap='gray') 
-    image = (data_normalized * 255).astype('uint8')
-
-
-# Définir un noyau pour l'érosion
-# Le noyau 3x3 détermine la forme et la taille de l'opération morphologique
-kernel = np.ones((3,3), np.uint8)  # Matrice 3x3 remplie de 1
 
-# Effectue l'érosion en fonction de l'image couleur et monochromes
-if data.ndim == 3:  # Image couleur
-    # Pour les images en couleur on applique l'érosion sur chaque canal
-    eroded_image = np.zeros_like(image, dtype='uint8')
-    for i in range(image.shape[2]):  # Pour chaque canal (R, G, B)
-        eroded_image[:, :, i] = cv.erode(image[:, :, i], kernel, iterations=2)
+    # Création du masque M (détection des étoiles) : seuil d'Otsu puis flou gaussien
+    M = masqueEtoilesOtsu(image, 7, 1.5)
 
-    # Création du masque M (détection des étoiles)
-    gray = cv.cvtColor(image, cv.COLOR_BGR2GRAY)
-    _, M = cv.threshold(gray, 0, 255, cv.THRESH_BINARY + cv.THRESH_OTSU)
+    if selectif:
+        # Érosion et interpolation des seules régions étoiles (même résultat, coût proportionnel à la surface des étoiles)
+        final = eroderEtoiles(image, M, kernel, iterations=2)
+    else:
+        # Érosion de tous les canaux (R, G, B) en un seul appel
+        eroded_image = eroderImage(image, kernel, iterations=2)
 
-    # Flou gaussien
-    M = cv.GaussianBlur(M, (7, 7), 1.5)
+        # Interpolation (en place, dans un seul tampon float32 à [0, 1])
+        final = melangerErosion(image, eroded_image, M)
 
-    # Normalisation et ajout d'une dimension pour broadcast
-    M = (M.astype(np.float32) / 255.0)[:, :, np.newaxis]
-
-    # Conversion float pour interpolation
-    image_f = image.astype(np.float32) / 255.0
-    eroded_f = eroded_image.astype(np.float32) / 255.0
-
-    # Interpolation 
-    final = M * eroded_f + (1 - M) * image_f
-
-    # Sauvegarde (image couleur)
-    plt.imsave('./results/eroded_interpol.png', final)
+    # Sauvegarde (image couleur, PNG 16 bits)
+    enregistrerPng('./results/eroded_interpol.png', final)
     print("Érosion avec interpolation effectuée pour l'image en couleur")
 else:  # Image monochrome
+    data_normalized = (data - data.min()) / (data.max() - data.min())
+    plt.imsave('./results/original.png', data_normalized, cmap='gray')
 
     # Érosion simple d'itération unique
-    eroded_image = cv.erode(image, kernel, iterations=1)
-    # On sauvegarde l'image érodée
-    cv.imwrite('./results/eroded.png', eroded_image)
+    eroded_image = eroderImage(image, kernel, iterations=1)
+    # On sauvegarde l'image érodée (PNG 16 bits)
+    enregistrerPng('./results/eroded.png', eroded_image)
     print("Érosion simple effectuée pour l'image monochrome")
-
-# Fermer pour valider et éviter les fuites de mémoire
-hdul.close()
\ No newline at end of file
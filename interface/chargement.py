@@ -0,0 +1,103 @@
+# ----------------- #
+# ---- Modules ---- #
+# ----------------- #
+
+import os
+import numpy as np
+
+# ----------------- #
+# ---- Classes ---- #
+# ----------------- #
+
+class ChargeurFits() :
+
+    # Ouvre chaque fichier FITS une seule fois et sert ses pixels par memory map (aucune copie en RAM)
+    # Le fichier reste ouvert tant qu'il est le fichier courant : relancer le pipeline ne relit jamais le disque
+    # (fichier réécrit depuis son ouverture, date de modification ou taille changée : rouvert)
+
+    def __init__(self) :
+
+        self.__cheminImage = None
+        self.__etatFichier = None # (date de modification (ns), taille) du fichier courant à son ouverture
+        self.__hdul = None
+        self.__donnees = None # Vue lecture seule des pixels (créée au premier accès)
+
+    def ouvrir(self, cheminImage : str) :
+
+        # Vérifications validité chemin image
+
+        if not os.path.isfile(cheminImage) : # Fichier inexistant
+            raise FileNotFoundError(f"Fichier introuvable : {cheminImage}")
+
+        if not cheminImage.lower().endswith(('.fits', '.fit', '.fts')) : # Format incorrect
+            raise ValueError("Le fichier à charger doit être un fichier FITS (.fits, .fit, .fts)")
+
+        etat = os.stat(cheminImage)
+        etatFichier = (etat.st_mtime_ns, etat.st_size)
+
+        if cheminImage == self.__cheminImage and etatFichier == self.__etatFichier : # Fichier déjà ouvert et inchangé sur disque
+            return True
+
+        from astropy.io import fits # Import différé : coût d'import payé à la première ouverture
+
+        try : # Lecture en-tête uniquement (les pixels ne sont lus qu'au premier accès, par memory map)
+            hdul = fits.open(cheminImage, memmap=True)
+            contientDonnees = hdul[0].header.get('NAXIS', 0) > 0
+        except Exception as e :
+            raise ValueError(f"Le fichier à charger n'est pas un FITS valide : {e}")
+
+        if not contientDonnees : # Données image inexistantes : fichier courant conservé
+            hdul.close()
+            return False
+
+        # Remplacement fichier courant
+        self.fermer()
+        self.__cheminImage = cheminImage
+        self.__etatFichier = etatFichier
+        self.__hdul = hdul
+
+        return True
+
+    def fermer(self) :
+
+        if self.__hdul is not None :
+            self.__hdul.close()
+
+        self.__cheminImage = None
+        self.__etatFichier = None
+        self.__hdul = None
+        self.__donnees = None
+
+    def getCheminImage(self) :
+
+        return self.__cheminImage
+
+    def getEntete(self) :
+
+        return None if self.__hdul is None else self.__hdul[0].header
+
+    def getDonnees(self) :
+
+        if self.__hdul is None :
+            return None
+
+        if self.__donnees is None :
+            # Vue en lecture seule : une écriture accidentelle recopierait les pages du memory map en RAM
+            # (données avec BSCALE/BZERO : astropy les met à l'échelle une seule fois en mémoire)
+            self.__donnees = self.__hdul[0].data.view()
+            self.__donnees.flags.writeable = False
+
+        return self.__donnees
+
+    def parcourirPlans(self) :
+
+        # Générateur des plans 2D (indice, plan) des données courantes dans l'ordre du fichier (cube spectral, série temporelle, ...)
+        # indice : position du plan selon les dimensions précédant (ligne, colonne), () si image 2D
+        # Plans lus un à un depuis memory map : parcours à mémoire constante quel que soit le nombre de plans
+        donnees = self.getDonnees()
+
+        if donnees is None :
+            return
+
+        for indice in np.ndindex(donnees.shape[:-2]) :
+            yield indice, donnees[indice]
@@ -4,9 +4,14 @@
 
 import sys
 from modele import Modele
-from vue import Vue
+from noyau import CalculAnnule
+from fond import MOTEURS_FOND
+from etirement import ETIREMENTS
+from persistance import CacheDisque
+from vue import Vue, TAILLE_AFFICHAGE
 from PyQt6.QtWidgets import QApplication, QFileDialog
-from PyQt6.QtCore import QObject, QThread, pyqtSignal
+from PyQt6.QtGui import QPixmap
+from PyQt6.QtCore import QObject, QThread, QTimer, pyqtSignal, pyqtSlot
 
 # ----------------- #
 # ---- Classes ---- #
@@ -14,24 +19,102 @@ from PyQt6.QtCore import QObject, QThread, pyqtSignal
 
 class GenerateurImages(QObject) :
 
-    imagesPretes : pyqtSignal() = pyqtSignal()
+    # Travailleur persistant (vit dans un seul thread de calcul pour toute la durée de l'application)
+    # Demandes numérotées : seule la dernière demande compte, les demandes périmées sont ignorées ou annulées entre deux étapes
+
+    demandeCalcul : pyqtSignal = pyqtSignal(int, str) # (numéro demande, chemin image à charger ou '' pour simple recalcul)
+    imagesPretes : pyqtSignal = pyqtSignal(int, tuple, bool) # (numéro demande, images QImage à afficher, aperçu)
+    erreurCalcul : pyqtSignal = pyqtSignal(int, str) # (numéro demande, message)
+    demandePersistance : pyqtSignal = pyqtSignal() # Écriture des résultats retenus dans cache disque
 
     def __init__(self, modele : Modele) :
 
         super().__init__()
         self.modele : Modele = modele
+        self.derniereDemande : int = 0 # Écrit par thread interface, lu par thread de calcul
+        self.fenetreAffichage : tuple = (0.5, 0.5, 1.0) # Région affichée (voir Vue.getFenetreAffichage), idem
+
+        # Signal émis depuis thread interface, slot exécuté dans thread de calcul (connexion en file d'attente)
+        self.demandeCalcul.connect(self.genererImages)
+        self.demandePersistance.connect(self.persisterResultats)
+
+    def demander(self, numero : int, cheminImage : str = '') :
+
+        self.derniereDemande = numero # Rend immédiatement périmé tout calcul en cours
+        self.demandeCalcul.emit(numero, cheminImage)
+
+    @pyqtSlot(int, str) # Slot déclaré : exécuté dans thread du travailleur (et non dans thread ayant connecté le signal)
+    def genererImages(self, numero : int, cheminImage : str) :
+
+        if numero != self.derniereDemande and cheminImage == '' : # Demande déjà périmée : rien à calculer
+            return
+
+        try :
+
+            annulation = lambda : numero != self.derniereDemande
+
+            if cheminImage != '' : # Changement image (calcul complet, non annulable)
+                self.persisterResultats() # Résultats de image quittée conservés sur disque
+                self.modele.setCheminImage(cheminImage)
+
+            # Étapes pleine résolution toutes en cache (mise à jour répétée, retour à des valeurs précédentes) : images à jour sans aperçu
+            elif not self.modele.genererImagesEnCache() :
+
+                if self.modele.getFacteurApercu() > 1 : # Grande image : aperçu sur image réduite affiché d'abord
+                    self.modele.genererApercu(annulation)
+                    if numero == self.derniereDemande :
+                        self.imagesPretes.emit(numero, self.modele.getImagesAffichage(True, self.fenetreAffichage, TAILLE_AFFICHAGE), True)
+
+                self.modele.genererImages(annulation=annulation) # Puis pleine résolution, qui remplace aperçu
 
-    def genererImages(self) :
+            if numero == self.derniereDemande :
+                # Normalisation et conversion en QImage faites ici : thread interface ne fait que créer les pixmaps
+                # Seule la région visible est produite, à taille affichage (quelle que soit la taille de image)
+                self.imagesPretes.emit(numero, self.modele.getImagesAffichage(False, self.fenetreAffichage, TAILLE_AFFICHAGE), False)
 
-        self.modele.genererImages()
-        self.imagesPretes.emit()
+        except CalculAnnule : # Paramètres modifiés pendant calcul : demande suivante déjà en file d'attente
+            pass
+
+        except Exception as e :
+            self.erreurCalcul.emit(numero, str(e))
+
+    @pyqtSlot()
+    def persisterResultats(self) :
+
+        # Écriture de images entières dans cache disque : dans thread de calcul, interface jamais bloquée
+        try :
+            self.modele.persisterResultats()
+        except OSError : # Cache disque plein ou inaccessible : résultats simplement recalculés au prochain lancement
+            pass
 
 class Controleur() :
 
     def __init__(self) :
 
-        self.modele : Modele = Modele()
+        self.modele : Modele = Modele(cacheDisque=CacheDisque()) # Résultats conservés sur disque d'un lancement à l'autre
         self.vue : Vue = Vue()
+        self.vue.setMoteursFond(MOTEURS_FOND)
+        self.vue.setEtirements(ETIREMENTS)
+
+        # --- Calcul en arrière-plan --- #
+
+        # Thread de calcul unique et persistant
+        self.numeroDemande : int = 0
+        self.threadCalcul : QThread = QThread()
+        self.generateurImages : GenerateurImages = GenerateurImages(self.modele)
+        self.generateurImages.moveToThread(self.threadCalcul)
+        self.generateurImages.imagesPretes.connect(self.terminerMiseAJourImages)
+        self.generateurImages.erreurCalcul.connect(self.signalerErreurCalcul)
+        self.threadCalcul.start()
+        self.apercuAffiche : bool = False # Images affichées issues de aperçu (réaffichées à chaque zoom ou déplacement)
+        self.imagesAffichees : tuple = (None, None, None, None) # QImages actuellement affichées (panneaux inchangés non reconvertis)
+        QApplication.instance().aboutToQuit.connect(self.arreterCalcul)
+
+        # Anti-rebond : modifications rapprochées des paramètres (glissement d'un slider) regroupées en un seul calcul
+        self.minuterieMiseAJour : QTimer = QTimer()
+        self.minuterieMiseAJour.setSingleShot(True)
+        self.minuterieMiseAJour.setInterval(200) # ms sans nouvelle modification avant lancement du calcul
+        self.minuterieMiseAJour.timeout.connect(self.mettreAJourImages)
 
         # --------------- #
         # --- Signaux --- #
@@ -69,6 +152,12 @@ class Controleur() :
 
         self.vue.enregistrementImageSansEtoiles.connect(self.enregistrerImageSansEtoiles)
         self.vue.modificationFiltreEtoiles.connect(self.modifierFiltreEtoiles)
+        self.vue.modificationMoteurFond.connect(self.modifierMoteurFond)
+
+        # --- Affichage images --- #
+
+        self.vue.modificationEtirement.connect(self.modifierEtirement)
+        self.vue.modificationFenetreAffichage.connect(self.modifierFenetreAffichage)
 
     def chargerFichier(self) :
 
@@ -76,14 +165,16 @@ class Controleur() :
 
         if fichierLu != '' :
 
+            self.invaliderDemandes() # Recalcul inutile : chargement calcule déjà toutes les images
             self.modele.reinitialiserModele()
-            self.modele.setCheminImage(fichierLu)
-
             self.vue.reinitialiserParametres()
-            self.vue.remplirFenetre(self.modele.getPixmapImageOriginale(),
-                                    self.modele.getPixmapMasqueEtoilesAdouci(),
-                                    self.modele.getPixmapImageSansEtoiles(),
-                                    self.modele.getPixmapImageFinale())
+            self.vue.reinitialiserFenetreAffichage() # Nouvelle image affichée entière
+            self.generateurImages.fenetreAffichage = self.vue.getFenetreAffichage()
+
+            # Chargement et calcul dans thread de calcul (affichage à réception des images)
+            self.numeroDemande += 1
+            self.vue.setEtatChargement(True)
+            self.generateurImages.demander(self.numeroDemande, fichierLu)
             
     def enregistrerImages(self, cheminDossier : str) :
 
@@ -93,94 +184,167 @@ class Controleur() :
             self.modele.enregistrerMasqueEtoilesAdouci(cheminDossier + "/masque_etoiles")
             self.modele.enregistrerImageSansEtoiles(cheminDossier + "/sans_etoiles")
             self.modele.enregistrerImageFinale(cheminDossier + "/final")
+            self.generateurImages.demandePersistance.emit() # Paramètres retenus : résultats conservés sur disque
 
     def reinitialiserParametres(self) :
 
         self.modele.reinitialiserModele()
-        self.vue.reinitialiserParametres()
+        self.vue.reinitialiserParametres() # Sans signaux de modification : recalcul planifié une seule fois ici
+        self.planifierMiseAJour()
 
     def reinitialiserTout(self) :
 
+        # Calcul planifié ou en cours abandonné : ses images ne doivent pas remplir la fenêtre vidée
+        self.invaliderDemandes()
+        self.vue.setEtatChargement(False)
+
         self.modele.reinitialiserModele()
-        self.modele.setCheminImage(None)
+        self.modele.setCheminImage(None) # Image fermée, images et caches oubliés
+        self.generateurImages.demandePersistance.emit() # Résultats de image quittée écrits sur disque par thread de calcul
 
         self.vue.reinitialiserParametres()
         self.vue.viderFenetre()
+        self.generateurImages.fenetreAffichage = self.vue.getFenetreAffichage()
+        self.imagesAffichees = (None, None, None, None)
 
     def enregistrerImageOriginale(self, cheminImage : str) :
 
         if cheminImage != '' :
 
             self.modele.enregistrerImageOriginale(cheminImage)
+            self.generateurImages.demandePersistance.emit()
 
     def enregistrerMasqueEtoilesAdouci(self, cheminImage : str) :
 
         if cheminImage != '' :
 
             self.modele.enregistrerMasqueEtoilesAdouci(cheminImage)
+            self.generateurImages.demandePersistance.emit()
 
     def enregistrerImageSansEtoiles(self, cheminImage : str) :
 
         if cheminImage != '' :
 
             self.modele.enregistrerImageSansEtoiles(cheminImage)
+            self.generateurImages.demandePersistance.emit()
 
     def enregistrerImageFinale(self, cheminImage : str) :
 
         if cheminImage != '' :
 
             self.modele.enregistrerImageFinale(cheminImage)
+            self.generateurImages.demandePersistance.emit()
+
+    def invaliderDemandes(self) :
+
+        # Minuterie anti-rebond arrêtée et demande courante périmée : calcul en cours annulé à la prochaine étape,
+        # images éventuellement produites ignorées par terminerMiseAJourImages
+        self.minuterieMiseAJour.stop()
+        self.numeroDemande += 1
+        self.generateurImages.derniereDemande = self.numeroDemande
+
+    def planifierMiseAJour(self) :
+
+        # (Re)lancement minuterie anti-rebond : calcul lancé 200 ms après la dernière modification
+        if self.modele.getCheminImage() != None :
+            self.minuterieMiseAJour.start()
 
     def mettreAJourImages(self) :
 
-        self.vue.setEtatChargement(True) # Blocage vue tant que la génération d'images n'est pas achevée
+        self.minuterieMiseAJour.stop()
 
-        self.threadGenerationImages : QThread = QThread()
-        self.generateurImages : GenerateurImages = GenerateurImages(self.modele)
-        self.generateurImages.moveToThread(self.threadGenerationImages)
+        if self.modele.getCheminImage() == None :
+            return
 
-        self.threadGenerationImages.started.connect(self.generateurImages.genererImages)
-        self.generateurImages.imagesPretes.connect(self.terminerMiseAJourImages)
-        self.generateurImages.imagesPretes.connect(self.threadGenerationImages.quit)
-        self.generateurImages.imagesPretes.connect(self.generateurImages.deleteLater)
-        self.threadGenerationImages.finished.connect(self.threadGenerationImages.deleteLater)
+        # Nouvelle demande : calcul en cours (devenu périmé) annulé à la prochaine étape, vue jamais bloquée
+        self.numeroDemande += 1
+        self.vue.setEtatChargement(True)
+        self.generateurImages.demander(self.numeroDemande)
+
+    def terminerMiseAJourImages(self, numero : int, images : tuple, apercu : bool) : # Déclenché lorsque la génération d'images du modèle est terminée
+
+        if numero != self.numeroDemande : # Images d'une demande périmée
+            return
+
+        self.afficherImages(images) # Mise à jour images dans vue
+        self.vue.setEtatChargement(apercu) # Aperçu : calcul pleine résolution encore en cours
+        self.apercuAffiche = apercu
 
-        self.threadGenerationImages.start() # Lancement processus génération images
+    def afficherImages(self, images : tuple) :
 
-    def terminerMiseAJourImages(self) : # Déclenché lorsque la génération d'images du modèle est terminée
+        # Seuls les panneaux dont image a changé sont convertis en pixmap et transmis à vue
+        # (modèle renvoie le même objet QImage pour une image inchangée)
+        changees = tuple(None if image is affichee else image for image, affichee in zip(images, self.imagesAffichees))
+        self.imagesAffichees = images
+        self.vue.remplirFenetre(*(None if image is None else QPixmap.fromImage(image) for image in changees))
 
-        self.vue.remplirFenetre( # Mise à jour images dans vue
-            self.modele.getPixmapImageOriginale(),
-            self.modele.getPixmapMasqueEtoilesAdouci(),
-            self.modele.getPixmapImageSansEtoiles(),
-            self.modele.getPixmapImageFinale()
-        )
+    def modifierEtirement(self, etirement : str) :
 
-        self.vue.setEtatChargement(False) # Déblocage vue
+        self.modele.setEtirement(etirement)
+        self.reafficherImages()
+
+    def modifierFenetreAffichage(self, u : float, v : float, zoom : float) :
+
+        self.generateurImages.fenetreAffichage = (u, v, zoom) # Calculs suivants affichés avec même région
+        self.reafficherImages()
+
+    def reafficherImages(self) :
+
+        # Zoom, déplacement ou étirement : images affichées reproduites depuis pyramides (aucun recalcul du pipeline)
+        if self.modele.getCheminImage() == None :
+            return
+
+        apercu = self.apercuAffiche and self.modele.getApercu() is not None
+        self.afficherImages(self.modele.getImagesAffichage(apercu, self.generateurImages.fenetreAffichage, TAILLE_AFFICHAGE))
+
+    def signalerErreurCalcul(self, numero : int, message : str) :
+
+        if numero == self.numeroDemande :
+            self.vue.setEtatChargement(False)
+            self.vue.afficherErreur(message)
+
+    def arreterCalcul(self) :
+
+        # Fermeture application : calcul en cours annulé à la prochaine étape puis arrêt du thread de calcul
+        self.invaliderDemandes()
+        self.threadCalcul.quit()
+        self.threadCalcul.wait()
+        self.generateurImages.persisterResultats() # Résultats des derniers paramètres conservés sur disque (thread de calcul arrêté)
 
     def modifierSigmaClipping(self, valeur : float) :
 
         self.modele.setSigmaClipping(valeur)
+        self.planifierMiseAJour()
 
     def modifierFwhm(self, valeur : float) :
 
         self.modele.setFwhm(valeur)
+        self.planifierMiseAJour()
 
     def modifierThreshold(self, valeur : float) :
 
         self.modele.setThreshold(valeur)
+        self.planifierMiseAJour()
 
     def modifierRayon(self, valeur : int) :
 
         self.modele.setRayon(valeur)
+        self.planifierMiseAJour()
 
     def modifierFlouGaussien(self, valeur : float) :
 
         self.modele.setFlouGaussien(valeur)
+        self.planifierMiseAJour()
 
     def modifierFiltreEtoiles(self, valeur : int) :
 
         self.modele.setFiltreEtoiles(valeur)
+        self.planifierMiseAJour()
+
+    def modifierMoteurFond(self, valeur : str) :
+
+        self.modele.setMoteurFond(valeur)
+        self.planifierMiseAJour()
         
 # -------------- #
 # ---- Main ---- #
@@ -0,0 +1,165 @@
+# ----------------- #
+# ---- Modules ---- #
+# ----------------- #
+
+import numpy as np
+from statistiques import minimumMaximum
+
+# -------------------- #
+# ---- Constantes ---- #
+# -------------------- #
+
+# Étirements d'affichage disponibles : { nom : description affichée }
+ETIREMENTS = {
+    'lineaire' : "Linéaire (min - max)",                  # niveaux proportionnels aux valeurs
+    'percentile' : "Percentiles (0,5 % - 99,5 %)",        # linéaire entre deux percentiles, extrêmes saturés
+    'asinh' : "Asinh",                                    # arcsinh : fond faible rehaussé, étoiles non saturées
+    'log' : "Logarithmique",                              # log(1 + a × t) : rehaussement plus fort que asinh
+    'egalisation' : "Égalisation d'histogramme",          # niveaux répartis selon histogramme cumulé
+}
+
+# Nombre de niveaux des tables de correspondance des images flottantes (et classes de histogramme)
+NIVEAUX_TABLE = 65536
+
+# Nombre maximal de pixels lus pour histogramme (sous-échantillon régulier)
+PIXELS_HISTOGRAMME = 1024 * 1024
+
+# ------------------- #
+# ---- Fonctions ---- #
+# ------------------- #
+
+def histogrammeCumule(image : np.ndarray, minimum : float, maximum : float, nbClasses : int = NIVEAUX_TABLE) :
+
+    # Fraction de pixels de valeur <= borne haute de chaque classe (nbClasses classes régulières entre minimum et maximum)
+    # Sous-échantillon régulier : pas de tri, coût borné quelle que soit la taille
+    # (une valeur sur pas en mémoire si image contiguë, quel que soit son nombre de dimensions ; sinon pas identique sur lignes et colonnes)
+    if image.flags.c_contiguous :
+        echantillon = np.asarray(image.reshape(-1)[::max(1, image.size // PIXELS_HISTOGRAMME)], dtype=np.float64)
+    else :
+        pas = max(1, int(np.sqrt(image.size / PIXELS_HISTOGRAMME)))
+        echantillon = np.asarray(image[::pas, ::pas], dtype=np.float64).ravel()
+
+    classes = ((echantillon - minimum) * ((nbClasses - 1) / (maximum - minimum))).astype(np.int64)
+    comptes = np.bincount(np.clip(classes, 0, nbClasses - 1), minlength=nbClasses)
+
+    return np.cumsum(comptes) / max(1, comptes.sum())
+
+def transfert(nom : str, t : np.ndarray, cumule : np.ndarray = None,
+              bas : float = 0.5, haut : float = 99.5, facteur : float = None) :
+
+    # Fonction de transfert de l'étirement nom : t = valeur normalisée min-max dans [0, 1] -> niveau dans [0, 1]
+    # cumule : histogramme cumulé (histogrammeCumule), requis par 'percentile' et 'egalisation'
+
+    if nom == 'lineaire' :
+        return t
+
+    if nom == 'percentile' :
+        nbClasses = len(cumule)
+        tBas = np.searchsorted(cumule, bas / 100) / (nbClasses - 1)
+        tHaut = np.searchsorted(cumule, haut / 100) / (nbClasses - 1)
+        return np.clip((t - tBas) / max(tHaut - tBas, 1 / (nbClasses - 1)), 0, 1)
+
+    if nom == 'asinh' :
+        facteur = 5.0 if facteur is None else facteur
+        return np.arcsinh(facteur * t) / np.arcsinh(facteur)
+
+    if nom == 'log' :
+        facteur = 1000.0 if facteur is None else facteur
+        return np.log1p(facteur * t) / np.log1p(facteur)
+
+    if nom == 'egalisation' :
+        return cumule[np.clip((t * (len(cumule) - 1)).astype(np.int64), 0, len(cumule) - 1)]
+
+    raise ValueError(f"Étirement inconnu : {nom} (disponibles : {', '.join(ETIREMENTS)})")
+
+def etirerImage(image : np.ndarray, nom : str = 'lineaire', bornes : tuple = None, **parametres) :
+
+    # Image étirée en float 64 bits dans [0, 1] (calcul exact, sans table) : utilisable par les scripts
+    # parametres : bas, haut (percentiles) ou facteur (asinh, log), voir transfert
+    minimum, maximum = minimumMaximum(image) if bornes is None else bornes
+    if maximum == minimum : return np.zeros(image.shape, dtype=np.float64)
+
+    cumule = histogrammeCumule(image, minimum, maximum) if nom in ('percentile', 'egalisation') else None
+    return transfert(nom, (np.asarray(image, dtype=np.float64) - minimum) / (maximum - minimum), cumule, **parametres)
+
+# ----------------- #
+# ---- Classes ---- #
+# ----------------- #
+
+class Etirement() :
+
+    # Étirement d'affichage en uint8 préparé une seule fois pour une image (bornes, histogramme, tables de correspondance),
+    # puis appliqué à image entière ou à n'importe quelle région : niveaux identiques partout, aucun recalcul du pipeline
+    # Images entières : une entrée de table par valeur possible (résultat exact)
+    # Images flottantes : valeurs quantifiées sur NIVEAUX_TABLE niveaux puis table, sauf étirement linéaire (calcul direct exact)
+
+    def __init__(self, image : np.ndarray, nom : str = 'lineaire', bornes : tuple = None, **parametres) :
+
+        if nom not in ETIREMENTS : # Vérification validité
+            raise ValueError(f"Étirement inconnu : {nom} (disponibles : {', '.join(ETIREMENTS)})")
+
+        self.__nom = nom
+        self.__parametres = parametres
+        self.__minimum, self.__maximum = minimumMaximum(image) if bornes is None else bornes
+        self.__cumule = None
+        self.__tables = {} # { entiere : table uint8 } (construites à la première application)
+
+        if nom in ('percentile', 'egalisation') and self.__maximum != self.__minimum :
+            self.__cumule = histogrammeCumule(image, self.__minimum, self.__maximum)
+
+    def getNom(self) :
+
+        return self.__nom
+
+    def getBornes(self) :
+
+        return (self.__minimum, self.__maximum)
+
+    def __table(self, entiere : bool) :
+
+        # entiere : une entrée par entier entre minimum et maximum, sinon NIVEAUX_TABLE niveaux réguliers
+        if entiere not in self.__tables :
+            if entiere :
+                t = (np.arange(int(self.__minimum), int(self.__maximum) + 1, dtype=np.float64) - self.__minimum) / (self.__maximum - self.__minimum)
+            else :
+                t = np.arange(NIVEAUX_TABLE, dtype=np.float64) / (NIVEAUX_TABLE - 1)
+            self.__tables[entiere] = (transfert(self.__nom, t, self.__cumule, **self.__parametres) * 255).astype(np.uint8)
+
+        return self.__tables[entiere]
+
+    def appliquer(self, image : np.ndarray, sortie : np.ndarray = None) :
+
+        # Niveaux uint8 de image écrits dans sortie (tampon réutilisable, alloué si absent ou de forme différente)
+        # Par bandes de lignes : aucune copie de image entière (memory map possible)
+        if sortie is None or sortie.shape != image.shape or sortie.dtype != np.uint8 :
+            sortie = np.empty(image.shape, dtype=np.uint8)
+
+        # Si pixels tous de même couleur : tableau rempli de 0 (évite divisions par 0)
+        if self.__maximum == self.__minimum :
+            sortie.fill(0)
+            return sortie
+
+        # Table exacte pour entiers si nombre de valeurs raisonnable, sinon calcul flottant
+        entiere = np.issubdtype(image.dtype, np.integer) and self.__maximum - self.__minimum < NIVEAUX_TABLE * 16
+        lignesParBande = max(1, (1 << 20) // max(1, image[0].size)) # Bandes d'environ un million de valeurs
+
+        for debut in range(0, image.shape[0], lignesParBande) :
+
+            bande = image[debut : debut + lignesParBande]
+            sortieBande = sortie[debut : debut + lignesParBande]
+
+            if entiere : # Indice = valeur - minimum
+                np.take(self.__table(True), np.subtract(bande, int(self.__minimum), dtype=np.int64), out=sortieBande, mode='clip')
+
+            elif self.__nom == 'lineaire' : # Calcul direct en float 64 bits : (image - min) / (max - min) × 255, tronqué
+                calcul = np.subtract(bande, self.__minimum, dtype=np.float64)
+                calcul /= self.__maximum - self.__minimum
+                calcul *= 255
+                np.copyto(sortieBande, calcul, casting='unsafe')
+
+            else : # Quantification sur NIVEAUX_TABLE niveaux (valeurs hors bornes saturées par mode='clip')
+                calcul = np.subtract(bande, self.__minimum, dtype=np.float64)
+                calcul *= (NIVEAUX_TABLE - 1) / (self.__maximum - self.__minimum)
+                np.take(self.__table(False), calcul.astype(np.int64), out=sortieBande, mode='clip')
+
+        return sortie
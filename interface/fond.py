@@ -0,0 +1,116 @@
+# ----------------- #
+# ---- Modules ---- #
+# ----------------- #
+
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from tuiles import filtrerParTuiles
+
+# scipy et OpenCV importés dans les fonctions (MOTEURS_FOND lisible sans payer leur coût d'import)
+
+# -------------------- #
+# ---- Constantes ---- #
+# -------------------- #
+
+# Moteurs de calcul du fond (image sans étoiles) : { nom : description }
+MOTEURS_FOND = {
+    'exact' : "Médian exact",                          # scipy median_filter, coût proportionnel à taille² du filtre
+    'histogramme' : "Médian histogramme (8 bits)",     # OpenCV medianBlur à temps constant sur image quantifiée sur 256 niveaux
+    'separable' : "Médian séparable",                  # médian lignes puis colonnes, coût proportionnel à taille du filtre
+    'reduit' : "Médian sous-échantillonné",            # médian sur image réduite puis agrandissement
+    'ouverture' : "Ouverture morphologique",           # érosion puis dilatation (filtres min/max séparables)
+}
+
+# ------------------- #
+# ---- Fonctions ---- #
+# ------------------- #
+
+def haloFond(filtreEtoiles : int, moteur : str = 'exact') :
+
+    # Portée du moteur : distance maximale des pixels lus pour calculer un pixel du fond
+    # (halo à ajouter autour d'une tuile ou d'une région pour un résultat identique au calcul sur image entière)
+    # Ouverture = érosion puis dilatation : deux fois la demi-taille du filtre
+    return 2 * (filtreEtoiles // 2) if moteur == 'ouverture' else filtreEtoiles // 2
+
+def calculerFond(image : np.ndarray, filtreEtoiles : int, moteur : str = 'exact', nbTravailleurs : int = 1) :
+
+    from scipy.ndimage import median_filter, grey_opening
+
+    # Image couleur (canal, ligne, colonne) : moteurs par tuiles filtrent chaque canal en 2D (voir filtrerParTuiles),
+    # moteurs OpenCV appliqués à chaque canal, canaux répartis sur les cœurs
+    if image.ndim > 2 and moteur in ('histogramme', 'reduit') :
+        with ThreadPoolExecutor(max_workers=max(1, nbTravailleurs)) as pool :
+            return np.stack(list(pool.map(lambda plan : calculerFond(plan, filtreEtoiles, moteur), image)))
+
+    if moteur == 'exact' :
+        return filtrerParTuiles(median_filter, image, filtreEtoiles // 2, nbTravailleurs, size=filtreEtoiles)
+
+    if moteur == 'separable' : # Approximation : médian des médians sur chaque ligne
+        fond = filtrerParTuiles(median_filter, image, filtreEtoiles // 2, nbTravailleurs, size=(1, filtreEtoiles))
+        return filtrerParTuiles(median_filter, fond, filtreEtoiles // 2, nbTravailleurs, size=(filtreEtoiles, 1))
+
+    if moteur == 'ouverture' : # Supprime structures claires plus petites que filtre (fond légèrement sous-estimé)
+        return filtrerParTuiles(grey_opening, image, haloFond(filtreEtoiles, moteur), nbTravailleurs, size=filtreEtoiles)
+
+    if moteur == 'histogramme' :
+        return calculerFondHistogramme(image, filtreEtoiles)
+
+    if moteur == 'reduit' :
+        return calculerFondReduit(image, filtreEtoiles)
+
+    raise ValueError(f"Moteur de fond inconnu : {moteur}")
+
+def calculerFondHistogramme(image : np.ndarray, filtreEtoiles : int) :
+
+    import cv2
+
+    # Quantification sur 256 niveaux entre percentiles 0.1 et 99.9 (estimés sur un échantillon)
+    # (les étoiles saturent à 255 mais n'influencent pas le médian du fond)
+    echantillon = image[::max(1, image.shape[0] // 256), ::max(1, image.shape[1] // 256)]
+    bas, haut = np.percentile(echantillon, (0.1, 99.9))
+    echelle = 255.0 / (haut - bas) if haut > bas else 1.0
+
+    image8 = np.clip((image - bas) * echelle, 0, 255).astype(np.uint8)
+
+    # medianBlur 8 bits d'OpenCV : histogrammes glissants (Perreault-Hébert), coût indépendant de taille du filtre
+    return cv2.medianBlur(image8, filtreEtoiles).astype(np.float32) / np.float32(echelle) + np.float32(bas)
+
+def calculerFondReduit(image : np.ndarray, filtreEtoiles : int) :
+
+    import cv2
+    from scipy.ndimage import median_filter
+
+    # Facteur de réduction choisi pour garder un filtre de 4 à 5 pixels environ sur image réduite
+    facteur = max(1, filtreEtoiles // 4)
+    filtreReduit = max(3, (filtreEtoiles // facteur) | 1) # Taille impaire
+
+    hauteur, largeur = image.shape
+    imageFloat = np.asarray(image, dtype=np.float32)
+
+    # Réduction par moyenne de blocs, médian, puis agrandissement bilinéaire
+    reduite = cv2.resize(imageFloat, (max(1, largeur // facteur), max(1, hauteur // facteur)), interpolation=cv2.INTER_AREA)
+    return cv2.resize(median_filter(reduite, size=filtreReduit), (largeur, hauteur), interpolation=cv2.INTER_LINEAR)
+
+def calculerFondEtoiles(image : np.ndarray, support : np.ndarray, filtreEtoiles : int, moteur : str = 'exact') :
+
+    from scipy.ndimage import label, find_objects
+
+    # Filtre médian calculé uniquement sur support du masque étoiles (pixels où masque adouci > 0)
+    # Ailleurs : pixels de image originale (le mélange final n'y utilise pas image sans étoiles)
+    # Image couleur (canal, ligne, colonne) : support (ligne, colonne) commun à tous les canaux
+    fond = np.array(image, dtype=image.dtype.newbyteorder('=')) # Ordre octets natif (comme sortie de median_filter)
+    halo = haloFond(filtreEtoiles, moteur)
+
+    # Une boîte englobante par composante connexe du support (une étoile ou un groupe d'étoiles qui se touchent)
+    etiquettes, _ = label(support)
+
+    for boite in find_objects(etiquettes) :
+
+        # Région lue = boîte + portée du moteur (résultat exact sur boîte, bords image gérés par filtre lui-même)
+        region = tuple(slice(max(s.start - halo, 0), min(s.stop + halo, taille)) for s, taille in zip(boite, image.shape[-2:]))
+        boiteDansRegion = tuple(slice(s.start - r.start, s.stop - r.start) for s, r in zip(boite, region))
+
+        selection = support[boite]
+        fond[(...,) + boite][..., selection] = calculerFond(image[(...,) + region], filtreEtoiles, moteur)[(...,) + boiteDansRegion][..., selection]
+
+    return fond
@@ -0,0 +1,198 @@
+# ----------------- #
+# ---- Modules ---- #
+# ----------------- #
+
+import os, sys, glob, time, argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from noyau import Noyau
+from fond import MOTEURS_FOND
+from persistance import CacheDisque
+
+# ---------------------------- #
+# ---- Variables globales ---- #
+# ---------------------------- #
+
+# Noyau de calcul propre à chaque processus (créé une fois, réutilisé pour tous les fichiers traités par ce processus)
+# Noyau plutôt que Modele : aucun import de Qt dans les processus de calcul
+modeleProcessus : Noyau = None
+
+# ------------------- #
+# ---- Fonctions ---- #
+# ------------------- #
+
+def listerFichiers(entrees : list) :
+
+    # Dossiers (fichiers FITS qu'ils contiennent), motifs glob ou chemins de fichiers, sans doublons et dans l'ordre
+    fichiers = []
+    vus = set() # Chemins absolus déjà retenus
+
+    for entree in entrees :
+
+        if os.path.isdir(entree) :
+            trouves = [f for f in glob.glob(os.path.join(entree, '*')) if f.lower().endswith(('.fits', '.fit', '.fts'))]
+        else : # Motif glob : seuls les fichiers FITS retenus (comme pour les dossiers)
+            trouves = [f for f in glob.glob(entree) if f.lower().endswith(('.fits', '.fit', '.fts'))]
+
+        for fichier in sorted(trouves) :
+            if os.path.isfile(fichier) and os.path.abspath(fichier) not in vus :
+                vus.add(os.path.abspath(fichier))
+                fichiers.append(fichier)
+
+    return fichiers
+
+def nommerDossiersSortie(fichiers : list, dossierSortie : str) :
+
+    # Un sous-dossier par fichier (nom du fichier sans extension, suffixé si deux fichiers ont le même nom)
+    dossiers = []
+    utilises = set()
+
+    for fichier in fichiers :
+
+        nom = os.path.splitext(os.path.basename(fichier))[0]
+        candidat = nom
+        indice = 2
+        while candidat in utilises :
+            candidat = f"{nom}_{indice}"
+            indice += 1
+
+        utilises.add(candidat)
+        dossiers.append(os.path.join(dossierSortie, candidat))
+
+    return dossiers
+
+def initialiserProcessus(parametres : dict, dossierCache : str|None) :
+
+    global modeleProcessus
+
+    # Un seul thread de calcul par processus : le parallélisme vient du nombre de processus
+    cacheDisque = CacheDisque(dossierCache) if dossierCache is not None else None
+    modeleProcessus = Noyau(nbTravailleurs=1, cacheDisque=cacheDisque, **parametres)
+
+def traiterFichier(cheminImage : str, dossierSortie : str, cube : bool = False, detectionCommune : bool = True) :
+
+    # Renvoie (chemin image, durée calcul, durée enregistrement, erreur ou None)
+    # cube : tous les plans du fichier traités en mode flux, images finales écrites dans un seul FITS (final_cube.fits)
+    try :
+
+        debut = time.perf_counter()
+        # Chargement et génération des images (cube : fichier seulement ouvert, plans générés un par un par genererCube)
+        modeleProcessus.setCheminImage(cheminImage, generer=not cube)
+
+        # Fichier refusé (pas un FITS, pas de données image) : noyau resté sur le fichier précédent, dont rien ne doit être enregistré
+        if modeleProcessus.getCheminImage() != cheminImage :
+            raise ValueError("Le fichier ne contient pas de données image FITS exploitables")
+
+        if cube : # Calcul et écriture plan par plan : durées non séparables
+            os.makedirs(dossierSortie, exist_ok=True)
+            modeleProcessus.genererCube(os.path.join(dossierSortie, "final_cube.fits"), detectionCommune)
+            return cheminImage, time.perf_counter() - debut, 0.0, None
+
+        dureeCalcul = time.perf_counter() - debut
+
+        debut = time.perf_counter()
+        os.makedirs(dossierSortie, exist_ok=True)
+        modeleProcessus.enregistrerImageOriginale(os.path.join(dossierSortie, "original"))
+        modeleProcessus.enregistrerMasqueEtoilesAdouci(os.path.join(dossierSortie, "masque_etoiles"))
+        modeleProcessus.enregistrerImageSansEtoiles(os.path.join(dossierSortie, "sans_etoiles"))
+        modeleProcessus.enregistrerImageFinale(os.path.join(dossierSortie, "final"))
+        modeleProcessus.persisterResultats() # Cache disque : résultats des paramètres du lot conservés
+        dureeEnregistrement = time.perf_counter() - debut
+
+        return cheminImage, dureeCalcul, dureeEnregistrement, None
+
+    except Exception as e : # Fichier invalide ou erreur de calcul : les autres fichiers sont traités quand même
+        return cheminImage, 0.0, 0.0, f"{type(e).__name__} : {e}"
+
+def lireArguments(arguments : list = None) :
+
+    parseur = argparse.ArgumentParser(description="Réduction d'étoiles sans interface graphique sur un lot de fichiers FITS")
+
+    parseur.add_argument('entrees', nargs='+', help="Dossiers, motifs glob (ex : 'nuit/*.fits') ou fichiers FITS")
+    parseur.add_argument('-o', '--sortie', default='resultats', help="Dossier de sortie (un sous-dossier par fichier)")
+    parseur.add_argument('-j', '--processus', type=int, default=os.cpu_count() or 1, help="Nombre de processus de calcul")
+    parseur.add_argument('--cache', nargs='?', const='', default=None,
+                         help="Utilisation du cache disque (dossier optionnel, par défaut ~/.cache/star-reduction)")
+    parseur.add_argument('--cube', action='store_true',
+                         help="Cubes (plans spectraux, séries temporelles) : chaque plan traité, images finales dans <sortie>/<fichier>/final_cube.fits")
+    parseur.add_argument('--detection-par-plan', action='store_true',
+                         help="Avec --cube : détection refaite sur chaque plan (par défaut : champ fixe, détection du plan central pour tous les plans)")
+
+    # Paramètres du pipeline (mêmes valeurs par défaut et mêmes corrections que Noyau)
+    parseur.add_argument('--sigma-clipping', type=float, default=3.0)
+    parseur.add_argument('--fwhm', type=float, default=3.0)
+    parseur.add_argument('--threshold', type=float, default=5.0)
+    parseur.add_argument('--rayon', type=int, default=None, help="Par défaut : 1.5 × fwhm")
+    parseur.add_argument('--flou-gaussien', type=float, default=2.0)
+    parseur.add_argument('--filtre-etoiles', type=int, default=None, help="Par défaut : 2 × rayon + 1")
+    parseur.add_argument('--moteur-fond', choices=list(MOTEURS_FOND), default='exact')
+    parseur.add_argument('--fond-etoiles-seulement', action='store_true')
+    parseur.add_argument('--precision', choices=['float64', 'float32'], default='float64')
+    parseur.add_argument('--erreur-statistiques', type=float, default=0.0)
+    parseur.add_argument('--taille-maille-fond', type=int, default=0)
+
+    return parseur.parse_args(arguments)
+
+def main(arguments : list = None) :
+
+    args = lireArguments(arguments)
+
+    fichiers = listerFichiers(args.entrees)
+
+    if len(fichiers) == 0 :
+        print("Aucun fichier FITS trouvé", file=sys.stderr)
+        return 1
+
+    parametres = {
+        'sigmaClipping' : args.sigma_clipping,
+        'fwhm' : args.fwhm,
+        'threshold' : args.threshold,
+        'rayon' : args.rayon if args.rayon is not None else int(1.5 * args.fwhm),
+        'flouGaussien' : args.flou_gaussien,
+        'filtreEtoiles' : args.filtre_etoiles if args.filtre_etoiles is not None else 0, # 0 : corrigé en 2 × rayon + 1 par Noyau
+        'moteurFond' : args.moteur_fond,
+        'fondEtoilesSeulement' : args.fond_etoiles_seulement,
+        'precision' : args.precision,
+        'erreurStatistiques' : args.erreur_statistiques,
+        'tailleMailleFond' : args.taille_maille_fond,
+    }
+
+    dossierCache = None
+    if args.cache is not None : # Sans dossier précisé : dossier par défaut du cache
+        dossierCache = args.cache or CacheDisque().getDossier()
+
+    dossiers = nommerDossiersSortie(fichiers, args.sortie)
+    nbProcessus = max(1, min(args.processus, len(fichiers)))
+
+    print(f"{len(fichiers)} fichier(s), {nbProcessus} processus, sortie : {args.sortie}")
+
+    debut = time.perf_counter()
+    nbErreurs = 0
+
+    # Chaque processus crée son propre modèle et son propre accès au cache (écritures du cache atomiques)
+    with ProcessPoolExecutor(max_workers=nbProcessus, initializer=initialiserProcessus, initargs=(parametres, dossierCache)) as executeur :
+
+        futurs = [executeur.submit(traiterFichier, fichier, dossier, args.cube, not args.detection_par_plan) for fichier, dossier in zip(fichiers, dossiers)]
+
+        for futur in as_completed(futurs) : # Affichage au fur et à mesure des fichiers terminés
+
+            cheminImage, dureeCalcul, dureeEnregistrement, erreur = futur.result()
+
+            if erreur is None :
+                print(f"{cheminImage} : calcul {dureeCalcul:.3f} s, enregistrement {dureeEnregistrement:.3f} s", flush=True)
+            else :
+                nbErreurs += 1
+                print(f"{cheminImage} : ERREUR {erreur}", file=sys.stderr, flush=True)
+
+    duree = time.perf_counter() - debut
+    print(f"Terminé : {len(fichiers) - nbErreurs} fichier(s) traité(s), {nbErreurs} erreur(s), "
+          f"{duree:.1f} s ({duree / len(fichiers):.3f} s par fichier)")
+
+    return 1 if nbErreurs > 0 else 0
+
+# -------------- #
+# ---- Main ---- #
+# -------------- #
+
+if __name__ == "__main__":
+
+    sys.exit(main())
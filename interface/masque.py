@@ -0,0 +1,66 @@
+# ----------------- #
+# ---- Modules ---- #
+# ----------------- #
+
+import numpy as np
+
+# ------------------- #
+# ---- Fonctions ---- #
+# ------------------- #
+
+def decalagesDisque(rayon : int) :
+
+    # Génération grille coordonnées centrée sur (0, 0)
+    yy, xx = np.ogrid[-rayon:rayon+1, -rayon:rayon+1]
+
+    # Décalages (dy, dx) des pixels qui sont dans cercle (même équation cercle que masque pixel par pixel)
+    dy, dx = np.nonzero((yy**2 + xx**2) <= rayon**2)
+
+    return dy - rayon, dx - rayon
+
+def peindreDisques(masque : np.ndarray, xs, ys, rayon : int, valeur = 1, origine : tuple = (0, 0)) :
+
+    # Coordonnées entières des centres (troncature vers 0 comme int()), exprimées dans repère du masque
+    # origine = coordonnées (y, x) dans image complète du pixel masque[0, 0] (permet de peindre dans une sous-région)
+    cx = np.trunc(np.asarray(xs, dtype=float)).astype(np.int64) - origine[1]
+    cy = np.trunc(np.asarray(ys, dtype=float)).astype(np.int64) - origine[0]
+
+    # Tamponnage du disque précalculé sur tous les centres à la fois :
+    # une itération par pixel du disque (quelques dizaines), chacune vectorisée sur toutes les étoiles
+    for dy, dx in zip(*decalagesDisque(rayon)) :
+
+        yy = cy + dy ; xx = cx + dx
+        dansImage = (yy >= 0) & (yy < masque.shape[0]) & (xx >= 0) & (xx < masque.shape[1]) # Pixels hors image ignorés
+        masque[yy[dansImage], xx[dansImage]] = valeur
+
+    return masque
+
+def centresSources(sources) :
+
+    # Coordonnées (xs, ys) des centres des étoiles d'une table de sources DAOStarFinder
+    # (colonnes "xcentroid" / "ycentroid", nommées "x_centroid" / "y_centroid" dans versions récentes de photutils)
+    if 'x_centroid' in sources.colnames :
+        return sources['x_centroid'], sources['y_centroid']
+
+    return sources['xcentroid'], sources['ycentroid']
+
+def rasteriserMasque(forme : tuple, xs, ys, rayon : int, dtype = int) :
+
+    # Création image vide puis marquage à 1 des disques de toutes les étoiles
+    return peindreDisques(np.zeros(forme, dtype=dtype), xs, ys, rayon)
+
+def centresModifies(anciennesSources, nouvellesSources, largeur : int) :
+
+    # Centres entiers (seuls utilisés par masque) présents dans une seule des deux tables de sources :
+    # disques à effacer (étoiles disparues) ou à peindre (étoiles apparues)
+    def coderCentres(sources) :
+        if sources is None :
+            return np.zeros(0, dtype=np.int64)
+        xs, ys = centresSources(sources)
+        cx = np.trunc(np.asarray(xs, dtype=float)).astype(np.int64)
+        cy = np.trunc(np.asarray(ys, dtype=float)).astype(np.int64)
+        return (cy + 1) * (largeur + 2) + (cx + 1) # Code unique par pixel (décalage de 1 par sécurité pour centres en bord)
+
+    modifies = np.setxor1d(coderCentres(anciennesSources), coderCentres(nouvellesSources))
+
+    return modifies % (largeur + 2) - 1, modifies // (largeur + 2) - 1 # (xs, ys)
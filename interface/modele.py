@@ -1,328 +1,139 @@
+# ----------------- #
+# ---- Modules ---- #
+# ----------------- #
+
 import numpy as np
-from astropy.io import fits
-from photutils.detection import DAOStarFinder
-from astropy.stats import sigma_clipped_stats
-import matplotlib.pyplot as plt
-from scipy.ndimage import gaussian_filter, median_filter
 from PyQt6.QtGui import QImage, QPixmap
-import os, cv2
-
-class Modele() :
-
-    def __init__(self, 
-                 cheminImage : str = None,
-                 sigmaClipping : float = 3.0,
-                 fwhm : float = 3.0, 
-                 threshold : float = 5.0,
-                 rayon : int = 4,
-                 flouGaussien : float = 2.0,
-                 filtreEtoiles : int = 5) :
-        
-        # --- Chemin image chargée --- #
-
-        self.__cheminImage = cheminImage
-
-        if cheminImage != None :
-
-            # Vérifications validité chemin image
-
-            if not os.path.isfile(cheminImage) : # Fichier inexistant
-                raise FileNotFoundError(f"Fichier introuvable : {cheminImage}")
-
-            if not cheminImage.lower().endswith(('.fits', '.fit', '.fts')) : # Format incorrect
-                raise ValueError("Le fichier à charger doit être un fichier FITS (.fits, .fit, .fts)")
-
-            try : # Données image inexistantes
-                with fits.open(cheminImage, memmap=False) as hdul :
-                    if hdul[0].data is None :
-                        raise ValueError("Le fichier FITS ne contient pas de données image")
-            except Exception as e :
-                raise ValueError(f"Le fichier à charger n'est pas un FITS valide : {e}")
-
-        # --- Sigma clipping (pour estimation correcte fond et bruit de l'image) --- #
-
-        self.__sigmaClipping = sigmaClipping
-        
-        if self.__sigmaClipping < 2.0 or self.__sigmaClipping > 5.0 : # Correction valeurs invalides
-            self.__sigmaClipping = 3.0
-        
-        # --- Fwhm (taille approximative étoiles en pixels pour DAOStarFinder) --- #
-
-        self.__fwhm = fwhm
-
-        if self.__fwhm < 1.5 or self.__fwhm > 10.0 : # Correction valeurs invalides
-            self.__fwhm = 3.0
-
-        # --- Threshold (seuil détection pour DAOStarFinder) --- #
-
-        self.__threshold = threshold
-
-        if self.__threshold < 3.0 or self.__threshold > 10.0 : # Correction valeurs invalides
-            self.__threshold = 5.0
-
-        # --- Rayon (rayon étoiles pour masque étoiles adouci) --- #
-
-        self.__rayon = rayon
-
-        if self.__rayon < (1.5 * self.__fwhm) or self.__rayon > (2 * self.__fwhm) : # Correction valeurs invalides
-            self.__rayon = int(1.5 * self.__fwhm)
-
-        # --- Flou gaussien (taux adoucissement bords étoiles pour masque étoiles adouci) --- #
-
-        self.__flouGaussien = flouGaussien
-
-        if self.__flouGaussien < 0.0 or self.__flouGaussien > 3.0 : # Correction valeurs invalides
-            self.__flouGaussien = 2.0
-        
-        # --- Filtre étoiles (pour image sans étoiles) --- #
-
-        self.__filtreEtoiles = filtreEtoiles
-
-        if self.__filtreEtoiles < (2 * self.__rayon + 1) or self.__filtreEtoiles % 2 == 0 : # Correction valeurs invalides
-            self.__filtreEtoiles = (2 * self.__rayon + 1)
-
-        # --- Cache pour éviter recalculs inutiles --- #
-        self.__cacheSources = None  # Cache pour détection étoiles
-        self.__cacheStats = None  # Cache pour statistiques image
-        self.__cacheParamsSources = None  # Paramètres utilisés pour cache sources
-        self.__cacheParamsStats = None  # Paramètres utilisés pour cache stats
-
-        # --- Initialisation images --- #
-
-        self.genererImages()
-
-    def genererImages(self) :
+from noyau import Noyau
+from pyramide import Pyramide
+from etirement import Etirement, ETIREMENTS
 
-        if self.__cheminImage == None :
+# ----------------- #
+# ---- Classes ---- #
+# ----------------- #
 
-            self.__imageOriginale = None
-            self.__masqueEtoilesAdouci = None
-            self.__imageSansEtoiles = None
-            self.__imageFinale = None
-        
-        else :
+class Modele(Noyau) :
 
-            # --- Image originale --- #
+    # Adaptateur graphique du noyau de calcul : conversion des images calculées par Noyau en pixmaps pour la vue
+    # (tout le calcul est dans noyau.py, qui ne dépend pas de Qt)
 
-            with fits.open(self.__cheminImage, memmap=False) as hdul:
-                self.__imageOriginale = hdul[0].data
+    def __init__(self, *args, **kwargs) :
 
+        # Caches d'affichage par image, indexés par (type, indice image) avec type 'pleine' ou 'apercu'
+        # Chaque entrée porte la version de l'image (Noyau.getVersions) : réutilisée tant que l'image n'a pas changé
+        self.__pyramides = {} # { (type, indice) : (version, image, pyramide, { nom : étirement }) }
+        self.__rendus = {} # { (type, indice) : ((version, fenetre, taille, étirement), QImage) } : dernier rendu de chaque panneau
+        self.__pixmaps = {} # { indice : ((version, étirement), QPixmap) } : pixmaps pleine résolution (thread interface)
+        self.__etirement = 'lineaire' # Étirement d'affichage (voir etirement.ETIREMENTS)
+        self.__tamponPixmap = None # Tampon uint8 de normalisation des pixmaps pleine résolution
+        super().__init__(*args, **kwargs)
 
-            if self.__imageOriginale.ndim == 3:
-                self.__imageOriginale = self.__imageOriginale[0] # Si image 3D : prendre première couche
-                # self.__imageOriginale[self.__imageOriginale.shape[0]//2] pour prendre couche centrale
-            elif self.__imageOriginale.ndim > 3:
-                self.__imageOriginale = self.__imageOriginale[0, 0] # Si + de 3 dimensions, extraire une slice 2D
+    def getImagesAffichage(self, apercu : bool = False, fenetre : tuple = None, taille : tuple = None) :
 
-            # Utilisation cache pour statistiques si sigma clipping n'a pas changé
-            if self.__cacheParamsStats != self.__sigmaClipping:
-                mean, median, std = sigma_clipped_stats(self.__imageOriginale, sigma=self.__sigmaClipping) # Calcul statistiques images
-                self.__cacheStats = (mean, median, std)  # Mise en cache
-                self.__cacheParamsStats = self.__sigmaClipping  # Sauvegarde paramètre
-            else:
-                mean, median, std = self.__cacheStats  # Récupération depuis cache
+        # Images étirées (étirement d'affichage courant) en QImage (originale, masque adouci, sans étoiles, finale), pleine résolution ou aperçu réduit
+        # Utilisable hors du thread de interface (contrairement à QPixmap) : préparation de affichage dans thread de calcul
+        # fenetre = (u, v, zoom) : seule la région visible, centrée en (u, v) (fractions de largeur et hauteur image),
+        # est produite, directement à taille (largeur, hauteur) d'affichage ; zoom = 1 : image entière
+        # Image inchangée (même version, fenêtre, taille et étirement) : même objet QImage que lors de l'appel précédent,
+        # sans nouvelle conversion (l'appelant peut ainsi ne mettre à jour que les panneaux modifiés)
+        images = self.getApercu() if apercu else (self.getImageOriginale(), self.getMasqueEtoilesAdouci(), self.getImageSansEtoiles(), self.getImageFinale())
+        versions = self.getVersions(apercu)
+        etirement = self.__etirement
+        rendus = []
 
-            # --- Masque étoiles adouci --- #
+        for i, (image, version) in enumerate(zip(images, versions)) :
 
-            # Utilisation cache pour détection étoiles si paramètres n'ont pas changé
-            if self.__cacheParamsSources != (self.__fwhm, self.__threshold, self.__sigmaClipping):
-                # Détection étoiles avec DAOStarFinder
-                daofind = DAOStarFinder(fwhm=self.__fwhm, threshold=self.__threshold*std) 
-                # Soustraction médiane par rapport à image pour améliorer détection étoiles
-                # sources contient tableau avec coordonées étoiles détectées et leurs propriétés (magnitude, largeur, etc...)
-                sources = daofind(self.__imageOriginale  - median)
-                self.__cacheSources = sources  # Mise en cache
-                self.__cacheParamsSources = (self.__fwhm, self.__threshold, self.__sigmaClipping)  # Sauvegarde paramètres
-            else:
-                sources = self.__cacheSources  # Récupération depuis cache
+            cle = ('apercu' if apercu else 'pleine', i)
+            cleRendu = (version, fenetre, taille, etirement)
+            rendu = self.__rendus.get(cle)
 
-            # Création image vide en fonction de image originale (dtype=int pour avoir masque binaire)
-            mask = np.zeros_like(self.__imageOriginale, dtype=int)
+            if rendu is None or rendu[0] != cleRendu :
+                if fenetre is None :
+                    qimage = self.convertirImageEnQImage(Etirement(image, etirement).appliquer(self.imageAffichable(image)))
+                else :
+                    qimage = self.convertirImageEnQImage(self.__regionAffichage(cle, version, image, fenetre, taille, etirement))
+                rendu = (cleRendu, qimage)
+                self.__rendus[cle] = rendu
 
-            # Pour chaque étoiles détectée dans sources : création cercle dans masque à position de étoile
-            # -- zip parcourt simultanément listes de coordonnées grâce aux "xcentroid" et "ycentroid" qui sont les coordonnées des centres des étoiles détectées --
-            if sources is not None : # Évite plantage si aucune étoile détectée
+            rendus.append(rendu[1])
 
-                for x, y in zip(sources['xcentroid'], sources['ycentroid']):
+        return tuple(rendus)
 
-                    y = int(y) ; x = int(x)
+    def __regionAffichage(self, cle : tuple, version, image : np.ndarray, fenetre : tuple, taille : tuple, etirement : str) :
 
-                    # Définition limites cercle en fonction du rayon (Utilisation max et min pour ne pas sortir des limites de l'image)
-                    y_min = max(y-self.__rayon, 0) ; y_max = min(y+self.__rayon+1, mask.shape[0])
-                    x_min = max(x-self.__rayon, 0) ; x_max = min(x+self.__rayon+1, mask.shape[1])
-                    
-                    # Génération cercle
-                    yy, xx = np.ogrid[y_min:y_max, x_min:x_max] # Génération grille coordonnées
-                    circle = (yy - y)**2 + (xx - x)**2 <= self.__rayon**2 # Équation cercle
-                    mask[y_min:y_max, x_min:x_max][circle] = 1 # Mise à valeurs des pixels du masque qui sont dans cercle à 1 pour marquer position étoile
+        # Pyramide et étirements de image : créés au premier affichage, conservés tant que la version de image est inchangée
+        entree = self.__pyramides.get(cle)
+        if entree is None or entree[0] != version or entree[1] is not image :
+            entree = (version, image, Pyramide(image), {})
+            self.__pyramides[cle] = entree
+        _, _, pyramide, etirements = entree
 
-            # Création masque étoiles avec bords adoucis par flou gaussien (qui évite transitions brutales entre étoile et fond)
-            self.__masqueEtoilesAdouci = gaussian_filter(mask.astype(float), sigma=self.__flouGaussien)
+        # Région visible en pixels image (maintenue dans image)
+        u, v, zoom = fenetre
+        hauteur, largeur = image.shape[-2:] # Image couleur : (canal, ligne, colonne)
+        largeurRegion, hauteurRegion = largeur / zoom, hauteur / zoom
+        x0 = min(max(u * largeur - largeurRegion / 2, 0), largeur - largeurRegion)
+        y0 = min(max(v * hauteur - hauteurRegion / 2, 0), hauteur - hauteurRegion)
+        region = pyramide.region(x0, y0, x0 + largeurRegion, y0 + hauteurRegion, taille)
 
-            # --- Image sans étoiles --- #
+        # Étirement préparé sur image entière (bornes, histogramme) : niveaux identiques quelle que soit la région affichée
+        # Changement d'étirement : seule la table de correspondance est recalculée, jamais le pipeline
+        if etirement not in etirements :
+            etirements[etirement] = Etirement(image, etirement, pyramide.getBornes())
+        return etirements[etirement].appliquer(region)
 
-            # Utilisation filtre médian pour estimer fond et supprimer étoiles
-            self.__imageSansEtoiles = median_filter(self.__imageOriginale, size=self.__filtreEtoiles)
+    def getEtirement(self) :
 
-            # --- Image finale --- #
-        
-            # Calcul image finale par interpolation
-            # Image finale = (masque × image sans étoiles) + ((1 - masque) × image originale)
-            # Là où masque = 1 (étoiles) : image sans étoiles
-            # Là où masque = 0 (fond), image originale
-            self.__imageFinale = (self.__masqueEtoilesAdouci * self.__imageSansEtoiles) + ((1 - self.__masqueEtoilesAdouci) * self.__imageOriginale)
+        return self.__etirement
 
-    def reinitialiserModele(self) :
+    def setEtirement(self, etirement : str) :
 
-        # --- Réinitialisation paramètres --- #
+        if etirement in ETIREMENTS : # Vérification validité
+            self.__etirement = etirement
 
-        self.__sigmaClipping = 3.0
-        self.__fwhm = 3.0
-        self.__threshold = 5.0
-        self.__rayon = int(1.5 * self.__fwhm)
-        self.__flouGaussien = 2.0
-        self.__filtreEtoiles = (2 * self.__rayon + 1)
-
-        # Invalidation cache
-        self.__cacheSources = None
-        self.__cacheStats = None
-        self.__cacheParamsSources = None
-        self.__cacheParamsStats = None
-
-    def getCheminImage(self) :
-
-        return self.__cheminImage
-    
-    def getSigmaClipping(self) :
-
-        return self.__sigmaClipping
-    
-    def getFwhm(self) :
-
-        return self.__fwhm
-    
-    def getThreshold(self) :
-
-        return self.__threshold
-    
-    def getRayon(self) :
-
-        return self.__rayon
-    
-    def getFlouGaussien(self) :
-
-        return self.__flouGaussien
-    
-    def getFiltreEtoiles(self) :
-
-        return self.__filtreEtoiles
-    
-    def getImageOriginale(self) :
-
-        return self.__imageOriginale
-    
-    def getMasqueEtoilesAdouci(self) :
-
-        return self.__masqueEtoilesAdouci
-    
-    def getImageSansEtoiles(self) :
-
-        return self.__imageSansEtoiles
-    
-    def getImageFinale(self) :
-
-        return self.__imageFinale
-    
     def getPixmapImageOriginale(self) :
 
-        return self.convertirImageEnPixmap(self.normaliserImage(self.__imageOriginale))
-    
-    def getPixmapMasqueEtoilesAdouci(self) :
-
-        return self.convertirImageEnPixmap(self.normaliserImage(self.__masqueEtoilesAdouci))
-    
-    def getPixmapImageSansEtoiles(self) :
-
-        return self.convertirImageEnPixmap(self.normaliserImage(self.__imageSansEtoiles))
-    
-    def getPixmapImageFinale(self) :
-
-        return self.convertirImageEnPixmap(self.normaliserImage(self.__imageFinale))
-    
-    def setCheminImage(self, cheminImage : str|None) :
-
-        # Vérifications validité chemin image
-
-        if cheminImage != None :
-
-            if os.path.isfile(cheminImage) : # Fichier existant
-
-                if cheminImage.lower().endswith(('.fits', '.fit', '.fts')) : # Format correct
+        return self.__pixmap(0, self.getImageOriginale())
 
-                    try : # Données image existantes
-
-                        with fits.open(cheminImage, memmap=False) as hdul :
-                            if not hdul[0].data is None : 
-                                self.__cheminImage = cheminImage
-                                # Invalidation cache lors changement image
-                                self.__cacheSources = None
-                                self.__cacheStats = None
-                                self.__cacheParamsSources = None
-                                self.__cacheParamsStats = None
-                                self.genererImages() # Maj images
-
-                    except Exception as e :
-                        raise ValueError(f"Le fichier à charger n'est pas un FITS valide : {e}")
-                
-    def setSigmaClipping(self, sigmaClipping : float) :
+    def getPixmapMasqueEtoilesAdouci(self) :
 
-        if sigmaClipping >= 2.0 and sigmaClipping <= 5.0 : # Vérification validité
-            self.__sigmaClipping = sigmaClipping
-    def setFwhm(self, fwhm : float) :
+        return self.__pixmap(1, self.getMasqueEtoilesAdouci())
 
-        if fwhm >= 1.5 and fwhm <= 10.0 : # Vérification validité
-            self.__fwhm = fwhm
-            # Maj rayon si devenu invalide par rapport à modification fwhm
-            if self.__rayon < (1.5 * self.__fwhm) or self.__rayon > (2 * self.__fwhm) :
-                self.setRayon(int(1.5 * self.__fwhm))
+    def getPixmapImageSansEtoiles(self) :
 
-    def setThreshold(self, threshold : float) :
+        return self.__pixmap(2, self.getImageSansEtoiles())
 
-        if threshold >= 3.0 and threshold <= 10.0 : # Vérification validité
-            self.__threshold = threshold
+    def getPixmapImageFinale(self) :
 
-    def setRayon(self, rayon : int) :
+        return self.__pixmap(3, self.getImageFinale())
 
-        rayon = int(rayon) # Conversion rayon en entier (par sécurité)
+    def __pixmap(self, indice : int, image : np.ndarray) :
 
-        if rayon >= int(1.5 * self.__fwhm) and rayon <= int(2 * self.__fwhm) : # Vérification validité
-            self.__rayon = rayon
-            # Maj filtre étoiles si devenu invalide par rapport à modification rayon
-            if self.__filtreEtoiles < (2 * self.__rayon + 1) :
-                self.setFiltreEtoiles(2 * self.__rayon + 1)
+        # Pixmap pleine résolution mis en cache : reconverti seulement si image (version) ou étirement a changé
+        cle = (self.getVersions()[indice], self.__etirement)
+        if indice not in self.__pixmaps or self.__pixmaps[indice][0] != cle :
+            self.__pixmaps[indice] = (cle, self.convertirImageEnPixmap(self.__etirerDansTampon(image)))
+        return self.__pixmaps[indice][1]
 
-    def setFlouGaussien(self, flouGaussien : float) :
+    def __etirerDansTampon(self, image : np.ndarray) :
 
-        if flouGaussien >= 0.0 and flouGaussien <= 3.0 : # Vérification validité
-            self.__flouGaussien = flouGaussien
+        # Tampon uint8 réutilisé d'un pixmap à l'autre : QPixmap.fromImage copie les pixels, tampon libre dès le retour
+        self.__tamponPixmap = Etirement(image, self.__etirement).appliquer(self.imageAffichable(image), self.__tamponPixmap)
+        return self.__tamponPixmap
 
-    def setFiltreEtoiles(self, filtreEtoiles : int) :
+    def imageAffichable(self, image : np.ndarray) :
 
-        if filtreEtoiles >= (2 * self.__rayon + 1) and filtreEtoiles % 2 == 1 : # Vérification validité
-            self.__filtreEtoiles = filtreEtoiles
+        # Image couleur du noyau (canal, ligne, colonne) vue en (ligne, colonne, canal) pour QImage (sans copie)
+        return np.moveaxis(image, 0, -1) if image.ndim == 3 else image
 
-    def normaliserImage(self, image) :
+    def convertirImageEnPixmap(self, image : np.uint8) :
 
-        # Conversion valeurs image en float 64 bits (évite problèmes arrondis et divisions par 0)
-        image = image.astype(np.float64) 
+        return QPixmap.fromImage(self.convertirImageEnQImage(image))
 
-        # Si pixels tous de même couleur : retour tableau rempli de 0 de type np.uint8 (évite divisions par 0)
-        if np.max(image) == np.min(image) : return np.zeros_like(image, dtype=np.uint8)
+    def convertirImageEnQImage(self, image : np.uint8) :
 
-        # Sinon : retour image normalisée
-        return ((image - np.min(image)) / (np.max(image) - np.min(image)) * 255).astype(np.uint8)
-    
-    def convertirImageEnPixmap(self, image : np.uint8) :
+        # QImage construite directement sur les pixels de image (aucune copie si lignes déjà contiguës)
+        image = np.ascontiguousarray(image, dtype=np.uint8)
 
         if image.ndim == 2:  # Image en niveaux de gris
 
@@ -339,21 +150,6 @@ class Modele() :
         else:
 
             raise ValueError("Format numpy non supporté pour QImage")
-        
-        return QPixmap.fromImage(qimage)
-
-    def enregistrerImageOriginale(self, cheminImage : str) :
-
-        cv2.imwrite(cheminImage + '.png', self.normaliserImage(self.__imageOriginale)) # Enregistrement image
-
-    def enregistrerMasqueEtoilesAdouci(self, cheminImage : str) :
-
-        cv2.imwrite(cheminImage + '.png', self.normaliserImage(self.__masqueEtoilesAdouci)) # Enregistrement image
-
-    def enregistrerImageSansEtoiles(self, cheminImage : str) :
-
-        cv2.imwrite(cheminImage + '.png', self.normaliserImage(self.__imageSansEtoiles)) # Enregistrement image
-
-    def enregistrerImageFinale(self, cheminImage : str) :
 
-        cv2.imwrite(cheminImage + '.png', self.normaliserImage(self.__imageFinale)) # Enregistrement image
\ No newline at end of file
+        qimage.pixels = image # Référence conservée : tableau numpy maintenu en vie aussi longtemps que QImage qui le lit
+        return qimage
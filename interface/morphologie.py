@@ -0,0 +1,265 @@
+# ----------------- #
+# ---- Modules ---- #
+# ----------------- #
+
+import numpy as np
+from etirement import Etirement
+from statistiques import minimumMaximum
+
+# OpenCV et astropy importés dans les fonctions (FORMES_NOYAU lisible sans payer leur coût d'import)
+
+# -------------------- #
+# ---- Constantes ---- #
+# -------------------- #
+
+# Formes du noyau d'érosion : { nom : description }
+FORMES_NOYAU = {
+    'rectangle' : "Rectangle",      # tous les pixels du carré taille × taille
+    'ellipse' : "Ellipse",          # disque inscrit dans le carré (érosion isotrope)
+    'croix' : "Croix",              # ligne et colonne centrales seulement
+}
+
+# Profondeurs de calcul de l'érosion : { type numpy : description }
+# Érosion (minimum local) commutant avec toute normalisation croissante : mêmes étoiles érodées, dynamique conservée
+PROFONDEURS = {
+    'uint8' : "8 bits (256 niveaux)",
+    'uint16' : "16 bits (65536 niveaux)",
+    'float32' : "Flottant 32 bits (dans [0, 1])",
+}
+
+# Coût fixe d'une région de eroderEtoiles (appels OpenCV et numpy), en valeurs d'érosion complète équivalentes
+# (environ 50 µs par région, temps d'érosion complète d'environ 8000 valeurs 8 bits)
+PIXELS_PAR_REGION = 8192
+
+# ------------------- #
+# ---- Fonctions ---- #
+# ------------------- #
+
+def creerNoyauErosion(forme : str = 'rectangle', taille : int = 3) :
+
+    import cv2
+
+    if forme not in FORMES_NOYAU : # Vérification validité
+        raise ValueError(f"Forme de noyau inconnue : {forme} (disponibles : {', '.join(FORMES_NOYAU)})")
+
+    formesCv = {'rectangle' : cv2.MORPH_RECT, 'ellipse' : cv2.MORPH_ELLIPSE, 'croix' : cv2.MORPH_CROSS}
+    return cv2.getStructuringElement(formesCv[forme], (taille, taille))
+
+def chargerImageErosion(cheminFits : str) :
+
+    from astropy.io import fits
+
+    # Données FITS en (ligne, colonne) ou (ligne, colonne, canal) : ordre attendu par OpenCV et matplotlib
+    # Image couleur (canal, ligne, colonne) vue en (ligne, colonne, canal) sans copie
+    donnees = fits.getdata(cheminFits)
+
+    if donnees.ndim == 3 and donnees.shape[0] == 3 :
+        donnees = np.transpose(donnees, (1, 2, 0))
+
+    return donnees
+
+def niveauMax(dtype) :
+
+    # Niveau du blanc : maximum du type entier, 1 pour les flottants
+    # (sans np.iinfo pour les entiers non signés : appelé pour chaque région par eroderEtoiles)
+    dtype = np.dtype(dtype)
+    if dtype.kind == 'u' :
+        return (1 << (8 * dtype.itemsize)) - 1
+    return np.iinfo(dtype).max if dtype.kind == 'i' else 1.0
+
+def normaliserCanaux(donnees : np.ndarray, sortie : np.ndarray = None, profondeur : str = 'uint8') :
+
+    # Niveaux [0, niveauMax] au type profondeur (voir PROFONDEURS) pour OpenCV, chaque canal normalisé min-max séparément
+    # Écrits directement dans sortie (ligne, colonne[, canal]) : aucun tableau intermédiaire par canal
+    if profondeur not in PROFONDEURS : # Vérification validité
+        raise ValueError(f"Profondeur inconnue : {profondeur} (disponibles : {', '.join(PROFONDEURS)})")
+
+    dtype = np.dtype(profondeur)
+    if sortie is None or sortie.shape != donnees.shape or sortie.dtype != dtype :
+        sortie = np.empty(donnees.shape, dtype=dtype)
+
+    plans = [(donnees, sortie)] if donnees.ndim == 2 else [(donnees[..., canal], sortie[..., canal]) for canal in range(donnees.shape[2])]
+
+    for plan, sortiePlan in plans :
+
+        if dtype == np.uint8 : # Table de correspondance ou calcul exact en float 64 bits (étirement linéaire partagé)
+            Etirement(plan).appliquer(plan, sortiePlan)
+            continue
+
+        minimum, maximum = minimumMaximum(plan)
+        if maximum == minimum : # Pixels tous de même valeur : canal à 0 (évite divisions par 0)
+            sortiePlan.fill(0)
+            continue
+
+        # Calcul en float32 (24 bits de mantisse : exact à un niveau près sur 16 bits), directement dans sortie si flottante
+        calcul = sortiePlan if dtype == np.float32 else np.empty(plan.shape, dtype=np.float32)
+        np.subtract(plan, minimum, out=calcul, dtype=np.float32)
+        np.multiply(calcul, np.float32(niveauMax(dtype) / (maximum - minimum)), out=calcul)
+        if calcul is not sortiePlan :
+            np.copyto(sortiePlan, calcul, casting='unsafe')
+
+    return sortie
+
+def eroderImage(image : np.ndarray, noyau : np.ndarray = None, iterations : int = 1, sortie : np.ndarray = None) :
+
+    import cv2
+
+    # Érosion de tous les canaux en un seul appel OpenCV sur image (ligne, colonne[, canal]) contiguë
+    # sortie : tampon réutilisable (alloué par OpenCV si absent ou de forme différente)
+    if noyau is None :
+        noyau = creerNoyauErosion()
+
+    image = np.ascontiguousarray(image)
+    if sortie is not None and (sortie.shape != image.shape or sortie.dtype != image.dtype) :
+        sortie = None
+
+    return cv2.erode(image, noyau, dst=sortie, iterations=iterations)
+
+def masqueEtoilesOtsu(image : np.ndarray, tailleFlou : int = 7, sigmaFlou : float = 1.5) :
+
+    import cv2
+
+    # Masque étoiles (ligne, colonne) en float32 dans [0, 1] : seuil d'Otsu sur niveaux de gris puis bords adoucis par flou gaussien
+    # Image 16 bits ou flottante : seuil calculé sur niveaux de gris ramenés à 8 bits (masque seul, image érodée non quantifiée)
+    gris = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    if gris.dtype != np.uint8 :
+        gris = convertirNiveaux(gris, np.uint8)
+    _, masque = cv2.threshold(gris, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    masque = cv2.GaussianBlur(masque, (tailleFlou, tailleFlou), sigmaFlou).astype(np.float32)
+    masque *= np.float32(1 / 255)
+
+    return masque
+
+def melangerErosion(image : np.ndarray, erodee : np.ndarray, masque : np.ndarray, sortie : np.ndarray = None) :
+
+    # Image finale float32 dans [0, 1] = masque × érodée + (1 - masque) × image (niveaux ramenés à [0, 1]), écrite en place dans sortie
+    # Forme équivalente image + masque × (érodée - image) : un seul tampon, aucun temporaire de taille image
+    # Image couleur : masque (ligne, colonne) appliqué à chaque canal par diffusion numpy
+    if sortie is None or sortie.shape != image.shape or sortie.dtype != np.float32 :
+        sortie = np.empty(image.shape, dtype=np.float32)
+
+    np.subtract(erodee, image, out=sortie, dtype=np.float32)
+    np.multiply(sortie, masque[..., np.newaxis] if image.ndim == 3 else masque, out=sortie)
+    np.add(sortie, image, out=sortie)
+    if niveauMax(image.dtype) != 1 :
+        np.multiply(sortie, np.float32(1 / niveauMax(image.dtype)), out=sortie)
+
+    return sortie
+
+def boitesEtoiles(masque : np.ndarray, bloc : int = 8) :
+
+    import cv2
+
+    # Boîtes englobantes (tranches ligne, colonne) des régions connexes (8-connexité) où masque > 0
+    # Composantes cherchées sur carte d'occupation par blocs bloc × bloc (maximum de chaque bloc) : bloc² fois moins de pixels,
+    # étoiles distantes de moins d'un bloc regroupées ; boîtes arrondies aux blocs (marge où masque nul, sans effet sur le mélange)
+    hauteur, largeur = masque.shape
+    occupation = cv2.compare(np.asarray(masque, dtype=np.float32), 0, cv2.CMP_GT)
+    occupation = cv2.dilate(occupation, np.ones((bloc, bloc), np.uint8), anchor=(0, 0))[::bloc, ::bloc] # Maximum de chaque bloc
+
+    _, _, stats, _ = cv2.connectedComponentsWithStats(np.ascontiguousarray(occupation), connectivity=8)
+
+    return [(slice(y * bloc, min((y + h) * bloc, hauteur)), slice(x * bloc, min((x + l) * bloc, largeur)))
+            for x, y, l, h, _ in stats[1:]] # Composante 0 : fond
+
+def eroderEtoiles(image : np.ndarray, masque : np.ndarray, noyau : np.ndarray = None, iterations : int = 1, sortie : np.ndarray = None,
+                  fractionMax : float = 0.5) :
+
+    # Même résultat que melangerErosion(image, eroderImage(image, noyau, iterations), masque), en n'érodant que les régions étoiles :
+    # boîte de chaque région connexe du masque (masque d'Otsu, ou masque adouci du pipeline issu de DAOStarFinder) lue avec un halo
+    # égal à la portée de l'érosion, érodée puis mélangée en place ; pixels hors masque recopiés tels quels (nébulosité intacte)
+    # Coût proportionnel à la surface des étoiles, plus un coût fixe par région (PIXELS_PAR_REGION)
+    # Coût estimé supérieur à fractionMax de celui d'une érosion complète (étoiles étendues ou très nombreuses) : érosion complète
+    if noyau is None :
+        noyau = creerNoyauErosion()
+
+    hauteur, largeur = masque.shape
+    portee = iterations * (max(noyau.shape) // 2) # Distance maximale d'influence de l'érosion
+
+    # Région lue (boîte + halo de portée) et position de la boîte dans cette région
+    regions = []
+    for coeur in boitesEtoiles(masque) :
+        region = tuple(slice(max(t.start - portee, 0), min(t.stop + portee, taille)) for t, taille in zip(coeur, (hauteur, largeur)))
+        regions.append((coeur, region, tuple(slice(t.start - r.start, t.stop - r.start) for t, r in zip(coeur, region))))
+
+    canaux = image.size // masque.size
+    cout = sum((ys.stop - ys.start) * (xs.stop - xs.start) * canaux + PIXELS_PAR_REGION for _, (ys, xs), _ in regions)
+    if cout > fractionMax * image.size :
+        return melangerErosion(image, eroderImage(image, noyau, iterations), masque, sortie)
+
+    if sortie is None or sortie.shape != image.shape or sortie.dtype != np.float32 :
+        sortie = np.empty(image.shape, dtype=np.float32)
+
+    # Hors étoiles : image ramenée à [0, 1] (masque nul, mélange égal à image)
+    np.multiply(image, np.float32(1 / niveauMax(image.dtype)), out=sortie, dtype=np.float32)
+
+    for coeur, region, coeurDansRegion in regions :
+
+        # Boîtes voisines qui se chevauchent : valeurs exactes identiques écrites deux fois
+        erodee = eroderImage(image[region], noyau, iterations)
+        melangerErosion(image[coeur], erodee[coeurDansRegion], masque[coeur], sortie[coeur])
+
+    return sortie
+
+def convertirNiveaux(image : np.ndarray, dtype) :
+
+    # Image de niveaux [0, niveauMax] convertie vers un autre type (arrondi au plus proche si entier)
+    dtype = np.dtype(dtype)
+    if image.dtype == dtype :
+        return image
+
+    calcul = np.multiply(image, np.float32(niveauMax(dtype) / niveauMax(image.dtype)), dtype=np.float32)
+    if np.issubdtype(dtype, np.integer) :
+        np.rint(calcul, out=calcul)
+        np.clip(calcul, 0, niveauMax(dtype), out=calcul)
+
+    return calcul.astype(dtype)
+
+def enregistrerPng(cheminImage : str, image : np.ndarray, profondeur : str = 'uint16') :
+
+    import cv2
+
+    # PNG 8 ou 16 bits (profondeur 'uint8' ou 'uint16') d'une image de niveaux (ligne, colonne[, canal RVB])
+    # Image flottante dans [0, 1] : enregistrée en 16 bits sans passer par 8 bits
+    if profondeur not in ('uint8', 'uint16') : # Vérification validité
+        raise ValueError(f"Profondeur PNG invalide : {profondeur} (disponibles : uint8, uint16)")
+
+    image = convertirNiveaux(image, profondeur)
+    if image.ndim == 3 : # RVB -> BVR (ordre attendu par OpenCV)
+        image = image[..., ::-1]
+
+    cv2.imwrite(cheminImage, np.ascontiguousarray(image))
+
+def enregistrerFits(cheminImage : str, image : np.ndarray) :
+
+    from astropy.io import fits
+
+    # FITS au type de image (uint16 : BZERO ajouté par astropy, float32 : valeurs telles quelles)
+    # Image couleur (ligne, colonne, canal) enregistrée en (canal, ligne, colonne), ordre des fichiers d'entrée
+    if image.ndim == 3 :
+        image = np.ascontiguousarray(np.moveaxis(image, -1, 0))
+
+    fits.writeto(cheminImage, image, overwrite=True)
+
+def eroderFichier(cheminFits : str, forme : str = 'rectangle', taille : int = 3, iterations : int = 1, interpolation : bool = False,
+                  profondeur : str = 'uint8', selectif : bool = False, masque : np.ndarray = None) :
+
+    # Érosion complète d'un fichier FITS (scripts et traitements par lots) : renvoie (données, image normalisée, image érodée ou None, image finale ou None)
+    # interpolation : image finale = mélange image / image érodée selon masque étoiles (étoiles réduites, fond intact)
+    # profondeur : type des images normalisée et érodée (voir PROFONDEURS), érosion sans quantification 8 bits si 'uint16' ou 'float32'
+    # selectif : avec interpolation, seules les régions étoiles sont érodées (eroderEtoiles, image érodée entière non calculée)
+    # masque : masque étoiles (ligne, colonne) dans [0, 1], par exemple Noyau.getMasqueEtoilesAdouci() (DAOStarFinder) ; par défaut masque d'Otsu
+    donnees = chargerImageErosion(cheminFits)
+    image = normaliserCanaux(donnees, profondeur=profondeur)
+    noyau = creerNoyauErosion(forme, taille)
+
+    if interpolation and masque is None :
+        masque = masqueEtoilesOtsu(image)
+
+    if interpolation and selectif :
+        return donnees, image, None, eroderEtoiles(image, masque, noyau, iterations)
+
+    erodee = eroderImage(image, noyau, iterations)
+    finale = melangerErosion(image, erodee, masque) if interpolation else None
+
+    return donnees, image, erodee, finale
@@ -0,0 +1,991 @@
+# ----------------- #
+# ---- Modules ---- #
+# ----------------- #
+
+# Noyau de calcul sans dépendance à Qt : photutils, scipy et OpenCV importés seulement au moment où ils servent
+# (processus de calcul et traitement par lots démarrent sans payer leur coût d'import)
+import numpy as np
+from masque import rasteriserMasque, peindreDisques, centresModifies, centresSources
+from chargement import ChargeurFits
+from persistance import CacheDisque
+from statistiques import statistiquesEchantillon, grilleFond, interpolerGrille
+from etirement import Etirement
+from fond import MOTEURS_FOND, calculerFond, calculerFondEtoiles, haloFond
+from tuiles import decouperTuiles, tuilesTouchees, filtrerParTuiles, creerFitsMemmap, rayonFlouGaussien, reduireImage
+import os
+
+# -------------------- #
+# ---- Constantes ---- #
+# -------------------- #
+
+# Taille visée de l'image réduite utilisée pour l'aperçu (en pixels)
+PIXELS_APERCU = 1024 * 1024
+
+# Erreur des statistiques du mode par tuiles si aucune n'est demandée (erreurStatistiques = 0) : sous-échantillon
+# d'environ 400 000 pixels au lieu de image entière en mémoire (médian à 0,2 % de l'écart-type près)
+ERREUR_STATISTIQUES_TUILES = 0.002
+
+# Étapes volumineuses (image entière) écrites dans le cache disque seulement à l'enregistrement des images et en quittant l'image
+# (voir persisterResultats), pas à chaque réglage ; stockées dans leur type calculé (résultat relu identique au calcul)
+ETAPES_DIFFEREES = ('masqueAdouci', 'sansEtoiles')
+
+# ----------------- #
+# ---- Classes ---- #
+# ----------------- #
+
+class CalculAnnule(Exception) :
+
+    # Levée entre deux étapes du pipeline quand le calcul en cours est devenu inutile (paramètres modifiés entre-temps)
+    pass
+
+class LuminanceDifferee() :
+
+    # Luminance (moyenne des canaux) d'une image couleur (canal, ligne, colonne) calculée seulement sur les parties lues :
+    # luminance[::pas, ::pas] ne lit que les lignes et colonnes de l'échantillon (memory map), sans luminance entière en mémoire
+
+    def __init__(self, image : np.ndarray) :
+
+        self.__image = image
+        self.shape = image.shape[-2:]
+        self.size = self.shape[0] * self.shape[1]
+        self.ndim = 2
+
+    def __getitem__(self, cle) :
+
+        if not isinstance(cle, tuple) :
+            cle = (cle,)
+        return np.mean(self.__image[(slice(None),) + cle], axis=0, dtype=np.float64)
+
+    def __array__(self, dtype = None, copy = None) :
+
+        luminance = self[:, :]
+        return luminance if dtype is None else luminance.astype(dtype)
+
+class Noyau() :
+
+    def __init__(self, 
+                 cheminImage : str = None,
+                 sigmaClipping : float = 3.0,
+                 fwhm : float = 3.0, 
+                 threshold : float = 5.0,
+                 rayon : int = 4,
+                 flouGaussien : float = 2.0,
+                 filtreEtoiles : int = 5,
+                 moteurFond : str = 'exact',
+                 nbTravailleurs : int = None,
+                 fondEtoilesSeulement : bool = False,
+                 precision : str = 'float64',
+                 erreurStatistiques : float = 0.0,
+                 tailleMailleFond : int = 0,
+                 cacheDisque : CacheDisque = None) :
+        
+        # --- Chemin image chargée --- #
+
+        self.__cheminImage = cheminImage
+
+        # Chargeur FITS (une seule ouverture par image, pixels servis par memory map)
+        self.__chargeur = ChargeurFits()
+
+        if cheminImage != None :
+
+            # Vérifications validité chemin image (existence, format, en-tête FITS)
+            if not self.__chargeur.ouvrir(cheminImage) : # Données image inexistantes
+                raise ValueError("Le fichier à charger n'est pas un FITS valide : Le fichier FITS ne contient pas de données image")
+
+        # --- Sigma clipping (pour estimation correcte fond et bruit de l'image) --- #
+
+        self.__sigmaClipping = sigmaClipping
+        
+        if self.__sigmaClipping < 2.0 or self.__sigmaClipping > 5.0 : # Correction valeurs invalides
+            self.__sigmaClipping = 3.0
+        
+        # --- Fwhm (taille approximative étoiles en pixels pour DAOStarFinder) --- #
+
+        self.__fwhm = fwhm
+
+        if self.__fwhm < 1.5 or self.__fwhm > 10.0 : # Correction valeurs invalides
+            self.__fwhm = 3.0
+
+        # --- Threshold (seuil détection pour DAOStarFinder) --- #
+
+        self.__threshold = threshold
+
+        if self.__threshold < 3.0 or self.__threshold > 10.0 : # Correction valeurs invalides
+            self.__threshold = 5.0
+
+        # --- Rayon (rayon étoiles pour masque étoiles adouci) --- #
+
+        self.__rayon = rayon
+
+        if self.__rayon < (1.5 * self.__fwhm) or self.__rayon > (2 * self.__fwhm) : # Correction valeurs invalides
+            self.__rayon = int(1.5 * self.__fwhm)
+
+        # --- Flou gaussien (taux adoucissement bords étoiles pour masque étoiles adouci) --- #
+
+        self.__flouGaussien = flouGaussien
+
+        if self.__flouGaussien < 0.0 or self.__flouGaussien > 3.0 : # Correction valeurs invalides
+            self.__flouGaussien = 2.0
+        
+        # --- Filtre étoiles (pour image sans étoiles) --- #
+
+        self.__filtreEtoiles = filtreEtoiles
+
+        if self.__filtreEtoiles < (2 * self.__rayon + 1) or self.__filtreEtoiles % 2 == 0 : # Correction valeurs invalides
+            self.__filtreEtoiles = (2 * self.__rayon + 1)
+
+        # --- Moteur fond (algorithme de calcul image sans étoiles : médian exact ou approximations rapides) --- #
+
+        self.__moteurFond = moteurFond
+
+        if self.__moteurFond not in MOTEURS_FOND : # Correction valeurs invalides
+            self.__moteurFond = 'exact'
+
+        # --- Nombre de travailleurs (threads pour filtres médian et gaussien par tuiles) --- #
+
+        self.__nbTravailleurs = nbTravailleurs
+
+        if self.__nbTravailleurs == None or self.__nbTravailleurs < 1 : # Par défaut : tous les cœurs
+            self.__nbTravailleurs = os.cpu_count() or 1
+
+        # --- Fond étoiles seulement (filtre médian calculé uniquement sur zones étoiles du masque adouci) --- #
+
+        self.__fondEtoilesSeulement = fondEtoilesSeulement
+
+        # --- Précision (type flottant du masque adouci et de image finale : 'float64' ou 'float32') --- #
+
+        self.__precision = precision
+
+        if self.__precision not in ('float64', 'float32') : # Correction valeurs invalides
+            self.__precision = 'float64'
+
+        # Tampons préalloués réutilisés d'un calcul à l'autre : { nom : tableau }
+        self.__tampons = {}
+
+        # --- Erreur statistiques (statistiques sur sous-échantillon : erreur max du médian en fraction de écart-type, 0 = tous les pixels) --- #
+
+        self.__erreurStatistiques = erreurStatistiques
+
+        if self.__erreurStatistiques < 0.0 or self.__erreurStatistiques >= 1.0 : # Correction valeurs invalides
+            self.__erreurStatistiques = 0.0
+
+        # --- Taille maille fond (grille de fond soustraite avant détection au lieu du médian global, 0 = médian global) --- #
+
+        self.__tailleMailleFond = tailleMailleFond
+
+        if self.__tailleMailleFond != 0 and self.__tailleMailleFond < 16 : # Correction valeurs invalides
+            self.__tailleMailleFond = 0
+
+        # --- Cache par étape du pipeline (pour éviter recalculs inutiles) --- #
+
+        # Chaque étape est mémorisée avec la clé de ses entrées : { nom étape : (clé, résultat) }
+        # Clé d'une étape = ses propres paramètres + clés des étapes dont elle dépend
+        # Un cache par facteur de réduction : { facteur : { nom étape : (clé, résultat) } } (1 = pleine résolution, cache actif)
+        self.__cacheEtapes = {}
+        self.__cachesEtapes = {1 : self.__cacheEtapes}
+
+        # Dernier aperçu calculé (images réduites), None si aucun
+        self.__apercu = None
+
+        # Versions des images (originale, masque adouci, sans étoiles, finale) : clé de l'étape qui a produit chaque image
+        # Version inchangée = image inchangée (affichage réutilisable sans nouvelle conversion)
+        self.__versions = (None, None, None, None)
+        self.__versionsApercu = None
+
+        # Cache disque optionnel (résultats des étapes coûteuses conservés d'un lancement à l'autre, None = désactivé)
+        self.__cacheDisque = cacheDisque
+
+        # Résultats présents dans cache disque (lus ou écrits) : { (nom étape, clé) }, non réécrits par persisterResultats
+        self.__clesPersistees = set()
+
+        # Résultats non persistés de la dernière image quittée : [(nom étape, clé, résultat)], écrits au prochain persisterResultats
+        self.__resultatsQuittes = []
+
+        # Fonction d'annulation du calcul en cours (None = calcul non annulable)
+        self.__annulation = None
+
+        # --- Initialisation images --- #
+
+        self.genererImages()
+
+    def genererImages(self, annulation = None) :
+
+        # annulation : fonction sans argument renvoyant True si calcul en cours devenu inutile
+        # Vérifiée avant chaque étape à calculer : CalculAnnule levée, résultats des étapes terminées conservés en cache
+        self.__annulation = annulation
+
+        try :
+            images, self.__versions = self.__genererImages(1)
+            self.__imageOriginale, self.__masqueEtoilesAdouci, self.__imageSansEtoiles, self.__imageFinale = images
+        finally :
+            self.__annulation = None
+
+    def genererImagesEnCache(self) :
+
+        # Images pleine résolution produites seulement si aucune étape n'est à calculer (clés courantes toutes en cache) :
+        # arrêt à la première étape absente du cache, renvoie True si images à jour
+        try :
+            self.genererImages(annulation=lambda : True)
+        except CalculAnnule :
+            return False
+
+        return True
+
+    def genererApercu(self, annulation = None) :
+
+        # Pipeline complet sur image réduite d'un facteur getFacteurApercu() (retour visuel rapide avant calcul pleine résolution)
+        # Résultats disponibles par getApercu() : images pleine résolution inchangées
+        self.__annulation = annulation
+
+        try :
+            self.__apercu, self.__versionsApercu = self.__genererImages(self.getFacteurApercu())
+        finally :
+            self.__annulation = None
+
+    def __genererImages(self, facteur : int, plan : tuple = None, reference : tuple = None) :
+
+        # Pipeline complet sur image pleine résolution (facteur = 1) ou réduite d'un facteur (aperçu)
+        # Renvoie (image originale, masque étoiles adouci, image sans étoiles, image finale) et leurs versions
+        # plan = (indice, image) : pipeline appliqué à ce plan d'un cube au lieu de l'image du fichier (mode flux, voir genererCube)
+        # reference = (indice, image) : plan servant aux statistiques et à la détection (champ fixe : détection commune à tous les plans)
+
+        if self.__cheminImage == None :
+
+            return (None, None, None, None), (None, None, None, None)
+
+        else :
+
+            from scipy.ndimage import gaussian_filter # Import différé (voir en-tête)
+
+            # Instantané des paramètres (chaque étape calcule avec les valeurs ayant servi à construire sa clé)
+            cheminImage = self.__cheminImage
+            sigmaClipping = self.__sigmaClipping
+            fwhm = self.__fwhm
+            threshold = self.__threshold
+            rayon = self.__rayon
+            flouGaussien = self.__flouGaussien
+            filtreEtoiles = self.__filtreEtoiles
+            moteurFond = self.__moteurFond
+            nbTravailleurs = self.__nbTravailleurs # Sans effet sur résultats : absent des clés
+            fondEtoilesSeulement = self.__fondEtoilesSeulement
+            precision = self.__precision
+            erreurStatistiques = self.__erreurStatistiques
+            tailleMailleFond = self.__tailleMailleFond
+
+            if facteur > 1 : # Aperçu : paramètres en pixels ramenés à l'échelle de l'image réduite
+                fwhm = max(1.0, fwhm / facteur)
+                rayon = max(1, int(round(rayon / facteur)))
+                flouGaussien = flouGaussien / facteur
+                filtreEtoiles = max(2 * rayon + 1, int(filtreEtoiles / facteur) | 1)
+                tailleMailleFond = max(16, tailleMailleFond // facteur) if tailleMailleFond != 0 else 0
+
+            # Cache propre à chaque facteur (aperçu et pleine résolution ne s'évincent pas mutuellement), et au mode flux
+            nomCache = facteur if plan is None else f'cube{facteur}'
+            self.__cacheEtapes = self.__cachesEtapes.setdefault(nomCache, {})
+
+            # --- Graphe des étapes --- #
+
+            # chargement -> statistiques -> détection -> masque -> masque adouci --\
+            #      \----------------------------------------> image sans étoiles -> image finale
+            cleChargement = self.__cleChargement(cheminImage, facteur)
+            cleDetectee = cleChargement # Image dont la luminance sert aux statistiques et à la détection
+            if plan is not None :
+                cleChargement += ('plan',) + plan[0]
+                cleDetectee = cleChargement if reference is None else cleDetectee + ('plan',) + reference[0]
+            cleStatistiques = (cleDetectee, sigmaClipping, erreurStatistiques, tailleMailleFond)
+            cleDetectionBrute = (cleStatistiques, fwhm)
+            cleDetection = (cleStatistiques, fwhm, threshold)
+            cleMasque = (cleDetection, rayon)
+            cleMasqueAdouci = (cleMasque, flouGaussien, precision)
+            cleSansEtoiles = (cleChargement, filtreEtoiles, moteurFond)
+            if fondEtoilesSeulement : # Image sans étoiles dépend alors aussi du masque adouci (support du calcul)
+                cleSansEtoiles = (cleChargement, filtreEtoiles, moteurFond, cleMasqueAdouci)
+            cleFinale = (cleMasqueAdouci, cleSansEtoiles)
+
+            # --- Image originale --- #
+
+            imageOriginale = self.__executerEtape('chargement', cleChargement,
+                                                  lambda : np.asarray(plan[1]) if plan is not None
+                                                           else reduireImage(self.__chargerImage(cheminImage), facteur) if facteur > 1
+                                                           else self.__chargerImage(cheminImage))
+
+            # Luminance : statistiques, détection et masque calculés une seule fois pour tous les canaux (image couleur)
+            # Mode flux avec plan de référence : calculés une seule fois pour tous les plans (étapes retrouvées en cache)
+            luminance = self.__executerEtape('luminance', cleDetectee,
+                                             lambda : self.__calculerLuminance(imageOriginale if reference is None else np.asarray(reference[1])))
+
+            # Calcul statistiques images (fond : médian global ou grille de fond par mailles)
+            mean, median, std, grille = self.__executerEtape('statistiques', cleStatistiques,
+                                                             lambda : self.__calculerStatistiques(luminance, sigmaClipping, erreurStatistiques, tailleMailleFond),
+                                                             persistante=True)
+            fond = median if grille is None else interpolerGrille(grille, tailleMailleFond, luminance.shape)
+
+            # --- Masque étoiles adouci --- #
+
+            ancienneDetection = self.__cacheEtapes.get('detection') # Conservée pour mise à jour incrémentale du masque
+
+            # Détection au seuil minimal (3.0) une seule fois par (fwhm, statistiques) : convolution DAOStarFinder indépendante du seuil
+            sourcesBrutes = self.__executerEtape('detectionBrute', cleDetectionBrute,
+                                                 lambda : self.__detecterEtoiles(luminance, fond, std, fwhm, 3.0),
+                                                 persistante=True)
+
+            # Seuil demandé : simple filtrage des sources détectées au seuil minimal
+            sources = self.__executerEtape('detection', cleDetection,
+                                           lambda : self.__filtrerSources(sourcesBrutes, threshold)
+                                                    if sourcesBrutes is None or 'daofind_mag' in sourcesBrutes.colnames
+                                                    else self.__detecterEtoiles(luminance, fond, std, fwhm, threshold),
+                                           persistante=True)
+
+            # Si seule la détection a changé : masque, masque adouci et image finale en cache mis à jour uniquement autour des étoiles apparues ou disparues
+            # (les étapes suivantes retrouvent alors leurs résultats en cache)
+            if ancienneDetection is not None and not fondEtoilesSeulement :
+                self.__mettreAJourMasqueIncrementale(imageOriginale, ancienneDetection, sources, cleDetection, cleMasque, cleMasqueAdouci, cleSansEtoiles, cleFinale,
+                                                     rayon, flouGaussien)
+
+            mask = self.__executerEtape('masque', cleMasque,
+                                        lambda : self.__creerMasque(luminance.shape, sources, rayon))
+
+            # Création masque étoiles avec bords adoucis par flou gaussien (qui évite transitions brutales entre étoile et fond)
+            masqueEtoilesAdouci = self.__executerEtape('masqueAdouci', cleMasqueAdouci,
+                                                              lambda : filtrerParTuiles(gaussian_filter, mask, rayonFlouGaussien(flouGaussien),
+                                                                                        nbTravailleurs, sigma=flouGaussien, output=np.dtype(precision)),
+                                                              persistante=True)
+
+            # --- Image sans étoiles --- #
+
+            # Utilisation filtre médian (ou moteur approché) pour estimer fond et supprimer étoiles (étape la plus coûteuse : répartie sur les cœurs)
+            # Image couleur : tous canaux filtrés en un seul appel (canaux et tuiles répartis ensemble sur les cœurs)
+            if fondEtoilesSeulement : # Filtre médian limité aux zones où masque adouci est non nul (seules utilisées par mélange)
+                imageSansEtoiles = self.__executerEtape('sansEtoiles', cleSansEtoiles,
+                                                               lambda : calculerFondEtoiles(imageOriginale, masqueEtoilesAdouci > 0, filtreEtoiles, moteurFond),
+                                                               persistante=True)
+            else :
+                imageSansEtoiles = self.__executerEtape('sansEtoiles', cleSansEtoiles,
+                                                               lambda : calculerFond(imageOriginale, filtreEtoiles, moteurFond, nbTravailleurs),
+                                                               persistante=True)
+
+            # --- Image finale --- #
+        
+            # Calcul image finale par interpolation
+            # Image finale = (masque × image sans étoiles) + ((1 - masque) × image originale)
+            # Là où masque = 1 (étoiles) : image sans étoiles
+            # Là où masque = 0 (fond), image originale
+            # Image finale allouée à chaque nouveau résultat (image déjà publiée jamais réécrite : affichage et enregistrement
+            # depuis thread interface pendant le calcul suivant), seul le temporaire du mélange est réutilisé
+            imageFinale = self.__executerEtape('finale', cleFinale,
+                                                      lambda : self.__melanger(masqueEtoilesAdouci, imageSansEtoiles, imageOriginale, None,
+                                                                               self.__tampon(f'melange{nomCache}', imageOriginale.shape, precision)))
+
+            return (imageOriginale, masqueEtoilesAdouci, imageSansEtoiles, imageFinale), (cleChargement, cleMasqueAdouci, cleSansEtoiles, cleFinale)
+
+    def genererImageFinaleParTuiles(self, cheminSortie : str, tailleTuile : int = 1024) :
+
+        # Mode hors mémoire : image traitée par tuiles avec halo, image finale écrite dans un FITS en memory map
+        # Mémoire utilisée bornée par taille des tuiles (et non par taille de image) : statistiques sur sous-échantillon
+        # (ERREUR_STATISTIQUES_TUILES si aucune erreur demandée), luminance de détection calculée tuile par tuile
+
+        if self.__cheminImage == None :
+            return
+
+        from scipy.ndimage import gaussian_filter # Imports différés (voir en-tête)
+        from photutils.detection import DAOStarFinder
+
+        # Instantané des paramètres
+        cheminImage = self.__cheminImage
+        sigmaClipping = self.__sigmaClipping
+        fwhm = self.__fwhm
+        threshold = self.__threshold
+        rayon = self.__rayon
+        flouGaussien = self.__flouGaussien
+        filtreEtoiles = self.__filtreEtoiles
+        moteurFond = self.__moteurFond
+        precision = self.__precision
+        erreurStatistiques = self.__erreurStatistiques if self.__erreurStatistiques > 0 else ERREUR_STATISTIQUES_TUILES
+        tailleMailleFond = self.__tailleMailleFond
+
+        self.__cacheEtapes = self.__cachesEtapes.setdefault(1, {}) # Cache pleine résolution
+
+        # Image originale (memory map, rien n'est lu ici) et statistiques globales (étapes partagées avec genererImages)
+        # Seul le sous-échantillon des statistiques est lu (image couleur : luminance calculée sur cet échantillon seulement)
+        cleChargement = self.__cleChargement(cheminImage)
+        image = self.__executerEtape('chargement', cleChargement,
+                                     lambda : self.__chargerImage(cheminImage))
+        luminance = image if image.ndim == 2 else LuminanceDifferee(image)
+        mean, median, std, grille = self.__executerEtape('statistiques', (cleChargement, sigmaClipping, erreurStatistiques, tailleMailleFond),
+                                                         lambda : self.__calculerStatistiques(luminance, sigmaClipping, erreurStatistiques, tailleMailleFond),
+                                                         persistante=True)
+
+        # --- Taille halo pour des raccords exacts entre tuiles --- #
+
+        # Détection : noyau de convolution DAOStarFinder + distance de recherche des pics
+        daofind = DAOStarFinder(fwhm=fwhm, threshold=threshold*std)
+        haloDetection = max(daofind.kernel.x_radius, daofind.kernel.y_radius) + int(np.ceil(getattr(daofind, 'min_separation', 0) or 0)) + 1
+
+        # Masque adouci exact sur cœur si toutes étoiles dont disque touche cœur + rayon flou sont détectées
+        haloMasque = rayonFlouGaussien(flouGaussien) + rayon + 1
+
+        # Fond exact sur cœur si région lue couvre portée du moteur (demi-taille du filtre, double pour l'ouverture)
+        halo = max(haloMasque + haloDetection, haloFond(filtreEtoiles, moteurFond))
+
+        # --- Traitement par tuiles --- #
+
+        with creerFitsMemmap(cheminSortie, image.shape, np.dtype(precision)) as hdul :
+
+            sortie = hdul[0].data
+
+            for coeur, region, coeurDansRegion in decouperTuiles(image.shape, tailleTuile, halo) :
+
+                imageRegion = np.asarray(image[(...,) + region]) # Lecture de la seule région utile depuis disque (tous canaux)
+
+                luminanceRegion = self.__calculerLuminance(imageRegion) # Détection sur luminance de la tuile (image couleur)
+
+                fondRegion = median if grille is None else interpolerGrille(grille, tailleMailleFond, luminance.shape, region)
+                sources = self.__detecterEtoiles(luminanceRegion, fondRegion, std, fwhm, threshold)
+                masque = self.__creerMasque(luminanceRegion.shape, sources, rayon)
+                masqueAdouci = gaussian_filter(masque, sigma=flouGaussien, output=np.dtype(precision))
+                # (raccords exacts pour moteur 'exact' ; moteurs approchés calculés indépendamment sur chaque tuile)
+                if self.__fondEtoilesSeulement :
+                    sansEtoiles = calculerFondEtoiles(imageRegion, masqueAdouci > 0, filtreEtoiles, moteurFond)
+                else :
+                    sansEtoiles = calculerFond(imageRegion, filtreEtoiles, moteurFond)
+
+                sortie[(...,) + coeur] = self.__melanger(masqueAdouci[coeurDansRegion], sansEtoiles[(...,) + coeurDansRegion], imageRegion[(...,) + coeurDansRegion])
+
+            hdul.flush()
+
+    def genererCube(self, cheminSortie : str, detectionCommune : bool = True, annulation = None) :
+
+        # Mode flux pour cubes (plans spectraux, séries temporelles, ...) : chaque plan 2D du fichier passe par le pipeline complet,
+        # son image finale est écrite aussitôt dans un FITS de sortie en memory map (même forme que les données)
+        # Mémoire bornée par un plan (plus plan de référence) et ses résultats intermédiaires, quel que soit le nombre de plans
+        # detectionCommune : champ fixe, statistiques, détection et masque calculés une seule fois sur plan central
+        # Renvoie le nombre de plans traités
+
+        if self.__cheminImage == None :
+            return 0
+
+        donnees = self.__chargeur.getDonnees()
+
+        reference = None
+        if detectionCommune :
+            indiceReference = np.unravel_index(int(np.prod(donnees.shape[:-2])) // 2, donnees.shape[:-2])
+            reference = (tuple(int(i) for i in indiceReference), donnees[indiceReference])
+
+        self.__annulation = annulation
+        nbPlans = 0
+
+        try :
+
+            with creerFitsMemmap(cheminSortie, donnees.shape, np.dtype(self.__precision)) as hdul :
+
+                sortie = hdul[0].data
+
+                for indice, plan in self.__chargeur.parcourirPlans() :
+
+                    (_, _, _, imageFinale), _ = self.__genererImages(1, (indice, plan), reference)
+                    sortie[indice] = imageFinale
+                    nbPlans += 1
+
+                hdul.flush()
+
+        finally :
+            self.__annulation = None
+            self.__cachesEtapes.pop('cube1', None) # Résultats des plans déjà écrits : mémoire libérée
+            self.__tampons.pop('melangecube1', None)
+            self.__cacheEtapes = self.__cachesEtapes[1]
+
+        return nbPlans
+
+    def __mettreAJourMasqueIncrementale(self, imageOriginale, ancienneDetection : tuple, sources, cleDetection : tuple, cleMasque : tuple, cleMasqueAdouci : tuple,
+                                        cleSansEtoiles : tuple, cleFinale : tuple, rayon : int, flouGaussien : float) :
+
+        from scipy.ndimage import gaussian_filter # Import différé (voir en-tête)
+
+        cleAncienneDetection, anciennesSources = ancienneDetection
+
+        if cleAncienneDetection == cleDetection or cleAncienneDetection[0][0] != cleDetection[0][0] : # Détection inchangée ou autre image
+            return
+
+        # Clés des résultats en cache si calculés depuis ancienne détection avec les paramètres actuels
+        cleAncienMasque = (cleAncienneDetection,) + cleMasque[1:]
+        cleAncienMasqueAdouci = (cleAncienMasque,) + cleMasqueAdouci[1:]
+        cleAncienneFinale = (cleAncienMasqueAdouci, cleSansEtoiles)
+
+        for nom, cle in (('masque', cleAncienMasque), ('masqueAdouci', cleAncienMasqueAdouci), ('sansEtoiles', cleSansEtoiles), ('finale', cleAncienneFinale)) :
+            if nom not in self.__cacheEtapes or self.__cacheEtapes[nom][0] != cle : # Résultat absent : calcul complet
+                return
+
+        # Copies mises à jour : masque adouci et image finale déjà publiés (affichage, enregistrement) jamais réécrits
+        # (copie mémoire bien moins coûteuse que flou et mélange sur image entière)
+        masque = self.__cacheEtapes['masque'][1].copy()
+        masqueAdouci = self.__cacheEtapes['masqueAdouci'][1].copy()
+        imageSansEtoiles = self.__cacheEtapes['sansEtoiles'][1]
+        imageFinale = self.__cacheEtapes['finale'][1].copy()
+
+        # Centres des disques à effacer ou à peindre
+        xs, ys = centresModifies(anciennesSources, sources, masque.shape[1])
+
+        # Tuiles où masque adouci peut changer : disque modifié + rayon flou gaussien
+        rayonFlou = rayonFlouGaussien(flouGaussien)
+        etendue = rayon + rayonFlou
+        tailleTuile = max(128, 4 * etendue)
+        tuiles = tuilesTouchees(xs, ys, etendue, masque.shape, tailleTuile)
+
+        nbTuiles = -(-masque.shape[0] // tailleTuile) * -(-masque.shape[1] // tailleTuile)
+        if len(tuiles) > nbTuiles // 2 : # Trop de changements : calcul complet plus rapide
+            return
+
+        # Centres entiers des nouvelles sources (pour repeindre les régions touchées)
+        if sources is None :
+            xsSources = ysSources = np.zeros(0, dtype=np.int64)
+        else :
+            xsSources, ysSources = centresSources(sources)
+            xsSources = np.trunc(np.asarray(xsSources, dtype=float)).astype(np.int64)
+            ysSources = np.trunc(np.asarray(ysSources, dtype=float)).astype(np.int64)
+
+        for indice, (coeur, region, coeurDansRegion) in enumerate(decouperTuiles(masque.shape, tailleTuile, rayonFlou)) :
+
+            if indice not in tuiles :
+                continue
+
+            # Masque repeint sur région (cœur + rayon flou) depuis nouvelles sources dont disque peut toucher région
+            masque[region] = 0
+            proches = ((xsSources >= region[1].start - rayon) & (xsSources < region[1].stop + rayon)
+                       & (ysSources >= region[0].start - rayon) & (ysSources < region[0].stop + rayon))
+            peindreDisques(masque[region], xsSources[proches], ysSources[proches], rayon, origine=(region[0].start, region[1].start))
+
+            # Flou et mélange recalculés sur cœur uniquement (exacts : région couvre rayon du flou)
+            masqueAdouci[coeur] = gaussian_filter(masque[region], sigma=flouGaussien, output=masqueAdouci.dtype)[coeurDansRegion]
+            self.__melanger(masqueAdouci[coeur], imageSansEtoiles[(...,) + coeur], imageOriginale[(...,) + coeur], finale=imageFinale[(...,) + coeur])
+
+        # Résultats mis à jour enregistrés sous les nouvelles clés
+        self.__cacheEtapes['masque'] = (cleMasque, masque)
+        self.__cacheEtapes['masqueAdouci'] = (cleMasqueAdouci, masqueAdouci)
+        self.__cacheEtapes['finale'] = (cleFinale, imageFinale)
+
+    def __executerEtape(self, nom : str, cle : tuple, calcul, persistante : bool = False) :
+
+        # Réutilisation résultat en cache si entrées de l'étape inchangées
+        if nom in self.__cacheEtapes and self.__cacheEtapes[nom][0] == cle :
+            return self.__cacheEtapes[nom][1]
+
+        trouve = False
+        if persistante and self.__cacheDisque is not None : # Étape coûteuse : résultat peut-être calculé lors d'un lancement précédent
+            trouve, resultat = self.__cacheDisque.lire(nom, cle)
+            if trouve :
+                self.__clesPersistees.add((nom, cle))
+
+        if not trouve :
+            if self.__annulation is not None and self.__annulation() : # Calcul devenu inutile : arrêt avant étape coûteuse
+                raise CalculAnnule()
+            resultat = calcul()
+            # Étapes volumineuses écrites plus tard (persisterResultats) : pas d'écriture de image entière à chaque réglage
+            if persistante and self.__cacheDisque is not None and nom not in ETAPES_DIFFEREES :
+                self.__cacheDisque.ecrire(nom, cle, resultat)
+                self.__clesPersistees.add((nom, cle))
+
+        self.__cacheEtapes[nom] = (cle, resultat) # Mise en cache
+        return resultat
+
+    def __identifierImage(self, cheminImage : str) :
+
+        # Avec cache disque : image identifiée par empreinte de son contenu (résultats retrouvés même après déplacement du fichier)
+        return cheminImage if self.__cacheDisque is None else self.__cacheDisque.empreinte(cheminImage)
+
+    def __cleChargement(self, cheminImage : str, facteur : int = 1) :
+
+        cle = (self.__identifierImage(cheminImage),)
+        if facteur > 1 : # Facteur dans les clés : résultats réduits distincts dans cache disque
+            cle += (facteur,)
+        donnees = self.__chargeur.getDonnees()
+        if donnees.ndim == 3 and donnees.shape[0] == 3 : # Image couleur : résultats calculés sur luminance, distincts dans cache disque
+            cle += ('couleur',)
+        return cle
+
+    def __chargerImage(self, cheminImage : str) :
+
+        # Pixels du fichier courant déjà ouvert par chargeur (memory map, aucune relecture disque)
+        image = self.__chargeur.getDonnees()
+
+        if image.ndim == 3 and image.shape[0] == 3 : # Image couleur (canal, ligne, colonne) : tous canaux conservés
+            return image
+
+        if image.ndim == 3:
+            image = image[0] # Si image 3D (autre que couleur) : prendre première couche
+            # image[image.shape[0]//2] pour prendre couche centrale
+        elif image.ndim > 3:
+            image = image[0, 0] # Si + de 3 dimensions, extraire une slice 2D
+
+        return image
+
+    def __calculerLuminance(self, image) :
+
+        # Image servant aux statistiques et à la détection : image elle-même si 2D,
+        # moyenne des canaux si couleur (une seule détection, un seul masque partagé par tous les canaux)
+        if image.ndim == 2 :
+            return image
+
+        return np.mean(image, axis=0, dtype=np.float64)
+
+    def __calculerStatistiques(self, image, sigmaClipping : float, erreurStatistiques : float, tailleMailleFond : int) :
+
+        # Statistiques globales (exactes ou sur sous-échantillon)
+        mean, median, std = statistiquesEchantillon(image, sigmaClipping, erreurStatistiques)
+
+        if tailleMailleFond == 0 : # Pas de grille : médian global soustrait avant détection
+            return mean, median, std, None
+
+        # Grille de fond par mailles (suit gradients de fond) et bruit global = médian des bruits des mailles
+        grille, bruit = grilleFond(image, sigmaClipping, tailleMailleFond, erreurStatistiques)
+        return mean, median, float(np.median(bruit)), grille
+
+    def __detecterEtoiles(self, image, fond, std : float, fwhm : float, threshold : float) :
+
+        from photutils.detection import DAOStarFinder # Import différé (voir en-tête)
+
+        # Détection étoiles avec DAOStarFinder
+        daofind = DAOStarFinder(fwhm=fwhm, threshold=threshold*std) 
+        # Soustraction fond (médian global ou carte de fond) par rapport à image pour améliorer détection étoiles
+        # sources contient tableau avec coordonées étoiles détectées et leurs propriétés (magnitude, largeur, etc...)
+        return daofind(image - fond)
+
+    def __filtrerSources(self, sourcesBrutes, threshold : float) :
+
+        # DAOStarFinder garde les maxima locaux de image convoluée supérieurs au seuil : les sources d'un seuil plus élevé
+        # sont donc celles du seuil minimal dont le pic convolué dépasse le nouveau seuil
+        # daofind_mag = -2.5 log10(pic convolué / seuil effectif minimal)
+        if sourcesBrutes is None or threshold <= 3.0 :
+            return sourcesBrutes
+
+        sources = sourcesBrutes[10 ** (-0.4 * np.asarray(sourcesBrutes['daofind_mag'])) > (threshold / 3.0)]
+
+        return sources if len(sources) > 0 else None # Même convention que DAOStarFinder si aucune étoile
+
+    def __creerMasque(self, forme : tuple, sources, rayon : int) :
+
+        # Création masque binaire (dtype=uint8 : 8 fois plus compact que int64) de même taille que image originale
+        # Pour chaque étoile détectée dans sources : création cercle dans masque à position de étoile
+        # -- "xcentroid" et "ycentroid" sont les coordonnées des centres des étoiles détectées --
+        if sources is None : # Évite plantage si aucune étoile détectée
+            return np.zeros(forme, dtype=np.uint8)
+
+        return rasteriserMasque(forme, *centresSources(sources), rayon, dtype=np.uint8)
+
+    def __melanger(self, masqueEtoilesAdouci, imageSansEtoiles, imageOriginale, finale = None, temporaire = None) :
+
+        # Image finale = (masque × image sans étoiles) + ((1 - masque) × image originale)
+        # Calcul en place dans tampons (alloués si non fournis), au type flottant du masque adouci
+        # Image couleur : masque (ligne, colonne) appliqué à chaque canal par diffusion numpy
+        forme = np.broadcast_shapes(masqueEtoilesAdouci.shape, imageOriginale.shape)
+        if finale is None :
+            finale = np.empty(forme, dtype=masqueEtoilesAdouci.dtype)
+        if temporaire is None :
+            temporaire = np.empty(forme, dtype=masqueEtoilesAdouci.dtype)
+
+        np.multiply(masqueEtoilesAdouci, imageSansEtoiles, out=finale)
+        np.subtract(1, masqueEtoilesAdouci, out=temporaire)
+        np.multiply(temporaire, imageOriginale, out=temporaire)
+        np.add(finale, temporaire, out=finale)
+
+        return finale
+
+    def persisterResultats(self) :
+
+        # Écriture dans cache disque des étapes volumineuses (ETAPES_DIFFEREES) de la dernière image quittée et des caches
+        # pleine résolution et aperçu : seuls les résultats des paramètres retenus sont écrits, pas ceux de chaque réglage
+        # Appelée après enregistrement des images et en quittant l'image, hors thread interface (écriture de images entières)
+        resultatsQuittes, self.__resultatsQuittes = self.__resultatsQuittes, []
+
+        if self.__cacheDisque is None :
+            return
+
+        for nom, cle, resultat in resultatsQuittes + self.__resultatsNonPersistes() :
+            self.__cacheDisque.ecrire(nom, cle, resultat)
+            self.__clesPersistees.add((nom, cle))
+
+    def __resultatsNonPersistes(self) :
+
+        # Copies des caches : thread de calcul peut les modifier pendant parcours (résultats publiés jamais réécrits)
+        resultats = []
+        for nomCache, cache in list(self.__cachesEtapes.items()) :
+            if not isinstance(nomCache, int) : # Mode flux : résultats des plans non conservés
+                continue
+            for nom, (cle, resultat) in list(cache.items()) :
+                if nom in ETAPES_DIFFEREES and (nom, cle) not in self.__clesPersistees :
+                    resultats.append((nom, cle, resultat))
+
+        return resultats
+
+    def __viderCaches(self) :
+
+        # Résultats de image quittée mis de côté sans écriture (appelant éventuellement dans thread interface) :
+        # écrits au prochain persisterResultats (seuls ceux de la dernière image quittée sont gardés, mémoire bornée)
+        if self.__cacheDisque is not None :
+            self.__resultatsQuittes = self.__resultatsNonPersistes()
+        self.__clesPersistees = set()
+        self.__cacheEtapes = {}
+        self.__cachesEtapes = {1 : self.__cacheEtapes}
+        self.__apercu = None
+        self.__versionsApercu = None
+
+    def __oublierImages(self) :
+
+        self.__imageOriginale = self.__masqueEtoilesAdouci = self.__imageSansEtoiles = self.__imageFinale = None
+        self.__versions = (None, None, None, None)
+        self.__tampons = {}
+
+    def __tampon(self, nom : str, forme : tuple, dtype) :
+
+        # Réutilisation tampon existant si même taille et même type (évite allocations à chaque calcul)
+        if nom not in self.__tampons or self.__tampons[nom].shape != forme or self.__tampons[nom].dtype != np.dtype(dtype) :
+            self.__tampons[nom] = np.empty(forme, dtype=dtype)
+
+        return self.__tampons[nom]
+
+    def reinitialiserModele(self) :
+
+        # --- Réinitialisation paramètres --- #
+
+        self.__sigmaClipping = 3.0
+        self.__fwhm = 3.0
+        self.__threshold = 5.0
+        self.__rayon = int(1.5 * self.__fwhm)
+        self.__flouGaussien = 2.0
+        self.__filtreEtoiles = (2 * self.__rayon + 1)
+        self.__moteurFond = 'exact'
+
+        # Caches conservés : chaque étape est indexée par ses propres paramètres (étapes non concernées, comme le chargement
+        # ou les statistiques, retrouvées en cache), vidés seulement au changement d'image (setCheminImage, setCacheDisque)
+
+    def getCheminImage(self) :
+
+        return self.__cheminImage
+    
+    def getSigmaClipping(self) :
+
+        return self.__sigmaClipping
+    
+    def getFwhm(self) :
+
+        return self.__fwhm
+    
+    def getThreshold(self) :
+
+        return self.__threshold
+    
+    def getRayon(self) :
+
+        return self.__rayon
+    
+    def getFlouGaussien(self) :
+
+        return self.__flouGaussien
+    
+    def getFiltreEtoiles(self) :
+
+        return self.__filtreEtoiles
+    
+    def getErreurStatistiques(self) :
+
+        return self.__erreurStatistiques
+
+    def getTailleMailleFond(self) :
+
+        return self.__tailleMailleFond
+
+    def getCacheDisque(self) :
+
+        return self.__cacheDisque
+
+    def getPrecision(self) :
+
+        return self.__precision
+
+    def getMoteurFond(self) :
+
+        return self.__moteurFond
+
+    def getNbTravailleurs(self) :
+
+        return self.__nbTravailleurs
+
+    def getFondEtoilesSeulement(self) :
+
+        return self.__fondEtoilesSeulement
+
+    def getImageOriginale(self) :
+
+        return self.__imageOriginale
+    
+    def getMasqueEtoilesAdouci(self) :
+
+        return self.__masqueEtoilesAdouci
+    
+    def getImageSansEtoiles(self) :
+
+        return self.__imageSansEtoiles
+    
+    def getImageFinale(self) :
+
+        return self.__imageFinale
+
+    def getApercu(self) :
+
+        # (image originale, masque étoiles adouci, image sans étoiles, image finale) réduites, ou None
+        return self.__apercu
+
+    def getVersions(self, apercu : bool = False) :
+
+        # Versions (comparables) des images pleine résolution ou de l'aperçu, dans l'ordre de getApercu()
+        return self.__versionsApercu if apercu else self.__versions
+
+    def getFacteurApercu(self) :
+
+        # Plus petite puissance de 2 (au plus 8) ramenant image sous PIXELS_APERCU pixels (1 : aperçu inutile)
+        if self.__cheminImage == None :
+            return 1
+
+        hauteur, largeur = self.__chargeur.getDonnees().shape[-2:]
+        facteur = 1
+        while facteur < 8 and (hauteur // facteur) * (largeur // facteur) > PIXELS_APERCU :
+            facteur *= 2
+
+        return facteur
+    
+    def setCheminImage(self, cheminImage : str|None, generer : bool = True) :
+
+        # generer = False : fichier seulement ouvert (en-tête lu, pixels en memory map), aucune image calculée
+        # (mode flux : genererCube traite ensuite les plans un par un sans pipeline préalable sur image entière)
+
+        # Vérifications validité chemin image
+
+        if cheminImage != None :
+
+            if os.path.isfile(cheminImage) : # Fichier existant
+
+                if cheminImage.lower().endswith(('.fits', '.fit', '.fts')) : # Format correct
+
+                    if self.__chargeur.ouvrir(cheminImage) : # Données image existantes (vérifiées depuis en-tête)
+                        self.__cheminImage = cheminImage
+                        # Invalidation cache lors changement image
+                        self.__viderCaches()
+                        if generer :
+                            self.genererImages() # Maj images
+                        else : # Images de image précédente oubliées
+                            self.__oublierImages()
+
+        else : # Fermeture image : fichier, images et caches libérés
+            self.__chargeur.fermer()
+            self.__cheminImage = None
+            self.__viderCaches()
+            self.__oublierImages()
+                
+    def setSigmaClipping(self, sigmaClipping : float) :
+
+        if sigmaClipping >= 2.0 and sigmaClipping <= 5.0 : # Vérification validité
+            self.__sigmaClipping = sigmaClipping
+    def setFwhm(self, fwhm : float) :
+
+        if fwhm >= 1.5 and fwhm <= 10.0 : # Vérification validité
+            self.__fwhm = fwhm
+            # Maj rayon si devenu invalide par rapport à modification fwhm
+            if self.__rayon < (1.5 * self.__fwhm) or self.__rayon > (2 * self.__fwhm) :
+                self.setRayon(int(1.5 * self.__fwhm))
+
+    def setThreshold(self, threshold : float) :
+
+        if threshold >= 3.0 and threshold <= 10.0 : # Vérification validité
+            self.__threshold = threshold
+
+    def setRayon(self, rayon : int) :
+
+        rayon = int(rayon) # Conversion rayon en entier (par sécurité)
+
+        if rayon >= int(1.5 * self.__fwhm) and rayon <= int(2 * self.__fwhm) : # Vérification validité
+            self.__rayon = rayon
+            # Maj filtre étoiles si devenu invalide par rapport à modification rayon
+            if self.__filtreEtoiles < (2 * self.__rayon + 1) :
+                self.setFiltreEtoiles(2 * self.__rayon + 1)
+
+    def setFlouGaussien(self, flouGaussien : float) :
+
+        if flouGaussien >= 0.0 and flouGaussien <= 3.0 : # Vérification validité
+            self.__flouGaussien = flouGaussien
+
+    def setFiltreEtoiles(self, filtreEtoiles : int) :
+
+        if filtreEtoiles >= (2 * self.__rayon + 1) and filtreEtoiles % 2 == 1 : # Vérification validité
+            self.__filtreEtoiles = filtreEtoiles
+
+    def setErreurStatistiques(self, erreurStatistiques : float) :
+
+        if erreurStatistiques >= 0.0 and erreurStatistiques < 1.0 : # Vérification validité
+            self.__erreurStatistiques = erreurStatistiques
+
+    def setTailleMailleFond(self, tailleMailleFond : int) :
+
+        if tailleMailleFond == 0 or tailleMailleFond >= 16 : # Vérification validité
+            self.__tailleMailleFond = tailleMailleFond
+
+    def setCacheDisque(self, cacheDisque : CacheDisque|None) :
+
+        self.persisterResultats() # Résultats écrits dans ancien cache (clés propres à son identification des images)
+        self.__viderCaches() # Clés des étapes dépendent de identification image (chemin ou empreinte)
+        self.__cacheDisque = cacheDisque
+
+    def setPrecision(self, precision : str) :
+
+        if precision in ('float64', 'float32') : # Vérification validité
+            self.__precision = precision
+
+    def setMoteurFond(self, moteurFond : str) :
+
+        if moteurFond in MOTEURS_FOND : # Vérification validité
+            self.__moteurFond = moteurFond
+
+    def setNbTravailleurs(self, nbTravailleurs : int) :
+
+        if nbTravailleurs >= 1 : # Vérification validité
+            self.__nbTravailleurs = nbTravailleurs
+
+    def setFondEtoilesSeulement(self, fondEtoilesSeulement : bool) :
+
+        self.__fondEtoilesSeulement = fondEtoilesSeulement
+
+    def normaliserImage(self, image : np.ndarray, sortie : np.ndarray = None, bornes : tuple = None) :
+
+        # Normalisation linéaire de image en uint8 : (image - min) / (max - min) × 255, calculée en float 64 bits
+        # Minimum et maximum en une passe (ou bornes fournies), écriture directe dans sortie (tampon uint8 réutilisable)
+        return Etirement(image, 'lineaire', bornes).appliquer(image, sortie)
+
+    def __normaliserDansTampon(self, image : np.ndarray) :
+
+        # Normalisation dans tampon réutilisé d'un enregistrement à l'autre (image écrite sur disque avant réutilisation)
+        # Image couleur (canal, ligne, colonne) : écrite en (ligne, colonne, canal) dans l'ordre BVR attendu par OpenCV
+        if image.ndim == 3 :
+            image = np.moveaxis(image, 0, -1)[..., ::-1]
+        return self.normaliserImage(image, self.__tampon('normalisation', image.shape, np.uint8))
+
+    def enregistrerImageOriginale(self, cheminImage : str) :
+
+        import cv2 # Import différé (voir en-tête)
+
+        cv2.imwrite(cheminImage + '.png', self.__normaliserDansTampon(self.__imageOriginale)) # Enregistrement image
+
+    def enregistrerMasqueEtoilesAdouci(self, cheminImage : str) :
+
+        import cv2
+
+        cv2.imwrite(cheminImage + '.png', self.__normaliserDansTampon(self.__masqueEtoilesAdouci)) # Enregistrement image
+
+    def enregistrerImageSansEtoiles(self, cheminImage : str) :
+
+        import cv2
+
+        cv2.imwrite(cheminImage + '.png', self.__normaliserDansTampon(self.__imageSansEtoiles)) # Enregistrement image
+
+    def enregistrerImageFinale(self, cheminImage : str) :
+
+        import cv2
+
+        cv2.imwrite(cheminImage + '.png', self.__normaliserDansTampon(self.__imageFinale)) # Enregistrement image
\ No newline at end of file
@@ -0,0 +1,193 @@
+# ----------------- #
+# ---- Modules ---- #
+# ----------------- #
+
+import os, json, hashlib, threading
+import numpy as np
+
+# ----------------- #
+# ---- Classes ---- #
+# ----------------- #
+
+class CacheDisque() :
+
+    # Cache persistant des résultats d'étapes du pipeline (un fichier .npz par résultat)
+    # Clé = nom étape + clé de l'étape, où le fichier image est identifié par l'empreinte de son contenu (pas par son chemin)
+    # Éviction des résultats les moins récemment utilisés (date de modification des fichiers) au-delà de tailleMax octets
+
+    def __init__(self, dossier : str = None, tailleMax : int = 2 * 1024**3) :
+
+        # --- Dossier du cache (par défaut ~/.cache/star-reduction) --- #
+
+        self.__dossier = dossier
+
+        if self.__dossier == None :
+            self.__dossier = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'), 'star-reduction')
+
+        os.makedirs(self.__dossier, exist_ok=True)
+
+        # --- Taille maximale du cache (octets) --- #
+
+        self.__tailleMax = tailleMax
+
+        if self.__tailleMax < 0 : # Correction valeurs invalides
+            self.__tailleMax = 2 * 1024**3
+
+        # Taille totale des résultats (octets) tenue à jour à chaque écriture : dossier parcouru seulement au premier
+        # dépassement de tailleMax (None = inconnue, dossier parcouru à la prochaine écriture)
+        self.__taille = None
+
+        # --- Empreintes des fichiers déjà hachés : { chemin : [date modification (ns), taille, empreinte] } --- #
+
+        self.__cheminEmpreintes = os.path.join(self.__dossier, 'empreintes.json')
+
+        try :
+            with open(self.__cheminEmpreintes, 'r') as fichier :
+                self.__empreintes = json.load(fichier)
+        except (OSError, ValueError) : # Premier lancement ou index illisible : empreintes recalculées
+            self.__empreintes = {}
+
+    def empreinte(self, cheminImage : str) :
+
+        # Empreinte SHA-256 du contenu du fichier, recalculée seulement si date de modification ou taille ont changé
+        cheminImage = os.path.abspath(cheminImage)
+        etat = os.stat(cheminImage)
+        memorisee = self.__empreintes.get(cheminImage)
+
+        if memorisee is not None and memorisee[0] == etat.st_mtime_ns and memorisee[1] == etat.st_size :
+            return memorisee[2]
+
+        hachage = hashlib.sha256()
+        with open(cheminImage, 'rb') as fichier :
+            for bloc in iter(lambda : fichier.read(1024 * 1024), b'') : # Lecture par blocs de 1 Mo
+                hachage.update(bloc)
+
+        self.__empreintes[cheminImage] = [etat.st_mtime_ns, etat.st_size, hachage.hexdigest()]
+        self.__ecrireAtomique(self.__cheminEmpreintes, lambda fichier : fichier.write(json.dumps(self.__empreintes).encode()))
+
+        return hachage.hexdigest()
+
+    def lire(self, nom : str, cle : tuple) :
+
+        # Renvoie (trouvé, résultat)
+        chemin = self.__cheminResultat(nom, cle)
+
+        try :
+            with np.load(chemin, allow_pickle=False) as archive :
+                resultat = self.__decoder(archive)
+        except Exception : # Absent ou illisible (écriture interrompue, autre version) : recalcul
+            return False, None
+
+        os.utime(chemin) # Résultat marqué comme récemment utilisé (ordre d'éviction)
+        return True, resultat
+
+    def ecrire(self, nom : str, cle : tuple, resultat) :
+
+        chemin = self.__cheminResultat(nom, cle)
+
+        try : # Résultat remplacé : sa taille est retirée du total
+            ancienneTaille = os.path.getsize(chemin)
+        except OSError :
+            ancienneTaille = 0
+
+        self.__ecrireAtomique(chemin, lambda fichier : np.savez(fichier, **self.__encoder(resultat)))
+
+        if self.__taille is not None :
+            self.__taille += os.path.getsize(chemin) - ancienneTaille
+
+        if self.__taille is None or self.__taille > self.__tailleMax :
+            self.__evincer()
+
+    def vider(self) :
+
+        for fichier in os.listdir(self.__dossier) :
+            if fichier.endswith('.npz') :
+                os.remove(os.path.join(self.__dossier, fichier))
+
+        self.__taille = 0
+
+    def getDossier(self) :
+
+        return self.__dossier
+
+    def getTailleMax(self) :
+
+        return self.__tailleMax
+
+    def setTailleMax(self, tailleMax : int) :
+
+        if tailleMax >= 0 : # Vérification validité
+            self.__tailleMax = tailleMax
+            self.__evincer()
+
+    def __cheminResultat(self, nom : str, cle : tuple) :
+
+        # Clés composées de chaînes, nombres, booléens et tuples : repr stable d'un lancement à l'autre
+        return os.path.join(self.__dossier, nom + '-' + hashlib.sha256(repr(cle).encode()).hexdigest()[:32] + '.npz')
+
+    def __ecrireAtomique(self, chemin : str, ecriture) :
+
+        # Écriture dans fichier temporaire puis renommage : jamais de fichier à moitié écrit sous le nom final
+        # (un temporaire par processus et par thread : écritures simultanées des lots et du thread interface)
+        temporaire = chemin + f'.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temporaire, 'wb') as fichier :
+            ecriture(fichier)
+        os.replace(temporaire, chemin)
+
+    def __evincer(self) :
+
+        # Suppression des résultats les moins récemment utilisés jusqu'à repasser sous tailleMax
+        fichiers = []
+        for entree in os.scandir(self.__dossier) :
+            if entree.name.endswith('.npz') :
+                etat = entree.stat()
+                fichiers.append((etat.st_mtime_ns, etat.st_size, entree.path))
+
+        taille = sum(f[1] for f in fichiers)
+
+        for _, tailleFichier, chemin in sorted(fichiers) :
+            if taille <= self.__tailleMax :
+                break
+            os.remove(chemin)
+            taille -= tailleFichier
+
+        self.__taille = taille # Total recalé sur le dossier (écritures des autres processus comprises)
+
+    def __encoder(self, resultat) :
+
+        from astropy.table import Table # Import différé : tables déjà chargées par photutils quand une table est enregistrée
+
+        # Résultat (ou tuple de résultats) -> tableaux numpy nommés e0, e1, ... + nature de chaque élément
+        elements = resultat if isinstance(resultat, tuple) else (resultat,)
+        tableaux = {'tuple' : np.array(isinstance(resultat, tuple))}
+        natures = []
+
+        for i, element in enumerate(elements) :
+            if element is None :
+                natures.append('aucun')
+            elif isinstance(element, Table) : # Table de sources DAOStarFinder : tableau structuré
+                natures.append('table')
+                tableaux[f'e{i}'] = element.as_array()
+            else : # Tableau ou scalaire numpy (type conservé)
+                natures.append('tableau')
+                tableaux[f'e{i}'] = np.asarray(element)
+
+        tableaux['natures'] = np.array(natures)
+        return tableaux
+
+    def __decoder(self, archive) :
+
+        from astropy.table import Table
+
+        elements = []
+
+        for i, nature in enumerate(archive['natures']) :
+            if nature == 'aucun' :
+                elements.append(None)
+            elif nature == 'table' :
+                elements.append(Table(archive[f'e{i}']))
+            else :
+                tableau = archive[f'e{i}']
+                elements.append(tableau[()] if tableau.ndim == 0 else tableau) # Scalaire numpy restitué comme scalaire
+
+        return tuple(elements) if archive['tuple'] else elements[0]
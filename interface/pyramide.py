@@ -0,0 +1,85 @@
+# ----------------- #
+# ---- Modules ---- #
+# ----------------- #
+
+import threading
+import numpy as np
+from tuiles import reduireImage
+from statistiques import minimumMaximum
+
+# ----------------- #
+# ---- Classes ---- #
+# ----------------- #
+
+class Pyramide() :
+
+    # Pyramide mip-map d'une image 2D ou couleur (canal, ligne, colonne) pour l'affichage : niveau k = image réduite d'un facteur 2^k par moyenne de blocs
+    # Seuls les niveaux d'au plus pixelsMax pixels sont conservés (construits à la première demande)
+    # Niveaux plus fins : région demandée réduite à la volée depuis image pleine résolution (coût borné par taille affichée)
+
+    def __init__(self, image : np.ndarray, pixelsMax : int = 4 * 1024 * 1024) :
+
+        self.__image = image
+        self.__niveaux = {} # { k : image réduite d'un facteur 2^k }
+        self.__bornes = None # (min, max) de image (normalisation identique pour toutes les régions)
+        self.__verrou = threading.Lock() # Construction des niveaux depuis thread interface ou thread de calcul
+
+        # Premier niveau conservé : plus petit k tel que niveau k fasse au plus pixelsMax pixels
+        self.__hauteur, self.__largeur = image.shape[-2:]
+        self.__niveauMin = 0
+        while (self.__hauteur >> self.__niveauMin) * (self.__largeur >> self.__niveauMin) > pixelsMax :
+            self.__niveauMin += 1
+
+    def getBornes(self) :
+
+        # Minimum et maximum de image pleine résolution (calculés une seule fois)
+        with self.__verrou :
+            if self.__bornes is None :
+                self.__bornes = minimumMaximum(self.__image)
+        return self.__bornes
+
+    def niveau(self, k : int) :
+
+        # Niveau conservé k (>= niveau minimal), construit par réductions successives depuis plus fin niveau déjà conservé
+        with self.__verrou :
+            if k not in self.__niveaux :
+                debut = max((n for n in self.__niveaux if n < k), default=None)
+                if debut is None : # Aucun niveau conservé : réduction directe de image pleine résolution
+                    debut = self.__niveauMin
+                    self.__niveaux[debut] = reduireImage(self.__image, 2 ** debut) if debut > 0 else self.__image
+                for n in range(debut + 1, k + 1) :
+                    self.__niveaux[n] = reduireImage(self.__niveaux[n - 1], 2)
+            return self.__niveaux[k]
+
+    def region(self, x0 : float, y0 : float, x1 : float, y1 : float, taille : tuple) :
+
+        # Région [x0, x1[ x [y0, y1[ (coordonnées pleine résolution) rééchantillonnée à taille (largeur, hauteur), en float32
+        # Image couleur : région renvoyée en (ligne, colonne, canal), ordre attendu par l'affichage
+        import cv2 # Import différé (coût d'import payé au premier affichage)
+
+        largeur, hauteur = taille
+
+        # Niveau le plus réduit gardant au moins autant de pixels que affichage (pas de perte de détail visible)
+        k = 0
+        while (x1 - x0) / 2 ** (k + 1) >= largeur and (y1 - y0) / 2 ** (k + 1) >= hauteur \
+              and (self.__hauteur >> (k + 1)) > 0 and (self.__largeur >> (k + 1)) > 0 :
+            k += 1
+
+        if k >= self.__niveauMin : # Niveau conservé : simple découpe
+            source = self.niveau(k)
+            echelle = 2 ** k
+            bloc = source[..., int(y0 // echelle) : max(int(y0 // echelle) + 1, int(np.ceil(y1 / echelle))),
+                               int(x0 // echelle) : max(int(x0 // echelle) + 1, int(np.ceil(x1 / echelle)))]
+        else : # Niveau fin : découpe pleine résolution alignée sur blocs 2^k puis réduction
+            echelle = 2 ** k
+            ya, xa = int(y0 // echelle) * echelle, int(x0 // echelle) * echelle
+            yb, xb = int(np.ceil(y1 / echelle)) * echelle, int(np.ceil(x1 / echelle)) * echelle
+            bloc = self.__image[..., ya:min(yb, self.__hauteur), xa:min(xb, self.__largeur)]
+            bloc = reduireImage(bloc, echelle) if k > 0 else np.asarray(bloc, dtype=np.float32)
+
+        if bloc.ndim == 3 :
+            bloc = np.moveaxis(bloc, 0, -1)
+
+        # Rééchantillonnage final : moyenne si réduction, bilinéaire si agrandissement
+        interpolation = cv2.INTER_AREA if bloc.shape[1] >= largeur else cv2.INTER_LINEAR
+        return cv2.resize(np.ascontiguousarray(bloc, dtype=np.float32), (largeur, hauteur), interpolation=interpolation)
@@ -0,0 +1,111 @@
+# ----------------- #
+# ---- Modules ---- #
+# ----------------- #
+
+import warnings
+import numpy as np
+
+# astropy.stats et scipy importés dans les fonctions (coût d'import payé seulement au premier calcul)
+
+# -------------------- #
+# ---- Constantes ---- #
+# -------------------- #
+
+# Nombre d'échantillons visé par bande de mailles de grilleFond (mémoire bornée quelle que soit la taille de image)
+ECHANTILLONS_BANDE_GRILLE = 1024 * 1024
+
+# ------------------- #
+# ---- Fonctions ---- #
+# ------------------- #
+
+def tailleEchantillon(erreurStatistiques : float) :
+
+    # Nombre de pixels pour que l'erreur type du médian (≈ 1.2533 × std / √n) reste sous erreurStatistiques × std
+    return int(np.ceil((1.2533 / erreurStatistiques) ** 2))
+
+def statistiquesEchantillon(image : np.ndarray, sigma : float, erreurStatistiques : float = 0.0) :
+
+    from astropy.stats import sigma_clipped_stats
+
+    # Statistiques sigma-clippées (moyenne, médian, écart-type) sur un sous-échantillon régulier de image
+    # erreurStatistiques = 0 : calcul exact sur tous les pixels
+    if erreurStatistiques <= 0 or image.size <= tailleEchantillon(erreurStatistiques) :
+        return sigma_clipped_stats(image, sigma=sigma)
+
+    # Pas identique sur lignes et colonnes (seules les lignes utiles sont lues si image en memory map)
+    pas = max(1, int(np.sqrt(image.size / tailleEchantillon(erreurStatistiques))))
+
+    return sigma_clipped_stats(image[::pas, ::pas], sigma=sigma)
+
+def grilleFond(image : np.ndarray, sigma : float, tailleMaille : int, erreurStatistiques : float = 0.0) :
+
+    from astropy.stats import sigma_clipped_stats
+    from scipy.ndimage import median_filter
+
+    # Grille grossière de fond (médian) et de bruit (écart-type) sigma-clippés, une valeur par maille de tailleMaille pixels
+    hauteur, largeur = image.shape
+    nbMaillesY = -(-hauteur // tailleMaille) ; nbMaillesX = -(-largeur // tailleMaille)
+
+    # Sous-échantillonnage dans chaque maille (pas diviseur de tailleMaille pour garder des mailles alignées sur les pixels)
+    pas = 1
+    if erreurStatistiques > 0 :
+        pas = max(1, int(np.sqrt(tailleMaille ** 2 / tailleEchantillon(erreurStatistiques))))
+        while tailleMaille % pas != 0 :
+            pas -= 1
+    cote = tailleMaille // pas # Nombre d'échantillons par côté de maille
+
+    # Grille calculée par bandes de lignes de mailles (statistiques de chaque maille indépendantes : résultat identique)
+    # Seules les lignes de la bande sont lues (image en memory map ou luminance différée)
+    maillesParBande = max(1, ECHANTILLONS_BANDE_GRILLE // (cote * cote * nbMaillesX))
+    fond = np.empty((nbMaillesY, nbMaillesX), dtype=np.float32) ; bruit = np.empty((nbMaillesY, nbMaillesX), dtype=np.float32)
+
+    for debut in range(0, nbMaillesY, maillesParBande) :
+
+        fin = min(debut + maillesParBande, nbMaillesY)
+
+        # Échantillons complétés par NaN jusqu'à un nombre entier de mailles, puis regroupés par maille
+        echantillon = np.full(((fin - debut) * cote, nbMaillesX * cote), np.nan, dtype=np.float32)
+        donnees = image[debut * tailleMaille : fin * tailleMaille : pas, ::pas]
+        echantillon[:donnees.shape[0], :donnees.shape[1]] = donnees
+        mailles = echantillon.reshape(fin - debut, cote, nbMaillesX, cote)
+
+        with warnings.catch_warnings() : # NaN de complétion ignorés volontairement
+            warnings.simplefilter('ignore')
+            _, fond[debut:fin], bruit[debut:fin] = sigma_clipped_stats(mailles, sigma=sigma, axis=(1, 3))
+
+    # Filtre médian 3x3 sur grille : élimine mailles faussées par une étoile brillante ou une nébuleuse compacte
+    return median_filter(fond, size=3), median_filter(bruit, size=3)
+
+def interpolerGrille(grille : np.ndarray, tailleMaille : int, forme : tuple, region : tuple = None) :
+
+    # Interpolation bilinéaire de la grille aux pixels de image (centres des mailles comme points d'appui)
+    # region : (slice lignes, slice colonnes) pour n'interpoler qu'une partie de image (valeurs identiques à image complète)
+    if region is None :
+        region = (slice(0, forme[0]), slice(0, forme[1]))
+
+    def poids(debut, fin, nbMailles) :
+        position = np.clip((np.arange(debut, fin) + 0.5) / tailleMaille - 0.5, 0, nbMailles - 1)
+        indice = np.minimum(position.astype(np.int64), max(nbMailles - 2, 0))
+        return indice, np.minimum(indice + 1, nbMailles - 1), (position - indice).astype(np.float32)
+
+    y0, y1, ty = poids(region[0].start, region[0].stop, grille.shape[0])
+    x0, x1, tx = poids(region[1].start, region[1].stop, grille.shape[1])
+
+    lignes = grille[y0] * (1 - ty)[:, None] + grille[y1] * ty[:, None] # Interpolation entre lignes de mailles
+    return lignes[:, x0] * (1 - tx) + lignes[:, x1] * tx # Puis entre colonnes
+
+def minimumMaximum(image : np.ndarray, hauteurBande : int = 1024) :
+
+    import cv2
+
+    # Minimum et maximum de image en une seule lecture, par bandes de lignes (mémoire bornée si image en memory map)
+    # Bande convertie en float64 natif seulement si type non géré par OpenCV (octets big-endian des FITS, entiers 64 bits...)
+    typeCompatible = image.dtype.isnative and image.dtype in (np.uint8, np.int8, np.uint16, np.int16, np.int32, np.float32, np.float64)
+    minimum, maximum = np.inf, -np.inf
+
+    for debut in range(0, image.shape[0], hauteurBande) :
+        bande = np.ascontiguousarray(image[debut : debut + hauteurBande], dtype=image.dtype if typeCompatible else np.float64)
+        minimumBande, maximumBande, _, _ = cv2.minMaxLoc(bande.reshape(bande.shape[0], -1))
+        minimum, maximum = min(minimum, minimumBande), max(maximum, maximumBande)
+
+    return minimum, maximum
@@ -0,0 +1,121 @@
+# ----------------- #
+# ---- Modules ---- #
+# ----------------- #
+
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+# ------------------- #
+# ---- Fonctions ---- #
+# ------------------- #
+
+def rayonFlouGaussien(flouGaussien : float) :
+
+    # Rayon du noyau utilisé par scipy.ndimage.gaussian_filter (troncature par défaut à 4 sigma)
+    return int(4.0 * flouGaussien + 0.5)
+
+def decouperTuiles(forme : tuple, tailleTuile : int, halo : int) :
+
+    # Parcours image par tuiles qui se chevauchent (deux dernières dimensions = hauteur, largeur)
+    # Pour chaque tuile : (cœur dans image, région lue avec halo dans image, cœur dans région lue)
+    hauteur, largeur = forme[-2:]
+
+    for y0 in range(0, hauteur, tailleTuile) :
+
+        for x0 in range(0, largeur, tailleTuile) :
+
+            # Cœur de la tuile (partie écrite en sortie)
+            y1 = min(y0 + tailleTuile, hauteur) ; x1 = min(x0 + tailleTuile, largeur)
+
+            # Région lue = cœur + halo (limité aux bords de image, où les filtres retrouvent leur propre gestion des bords)
+            ry0 = max(y0 - halo, 0) ; ry1 = min(y1 + halo, hauteur)
+            rx0 = max(x0 - halo, 0) ; rx1 = min(x1 + halo, largeur)
+
+            yield ((slice(y0, y1), slice(x0, x1)),
+                   (slice(ry0, ry1), slice(rx0, rx1)),
+                   (slice(y0 - ry0, y1 - ry0), slice(x0 - rx0, x1 - rx0)))
+
+def tuilesTouchees(xs : np.ndarray, ys : np.ndarray, etendue : int, forme : tuple, tailleTuile : int) :
+
+    # Indices (ordre de decouperTuiles) des tuiles touchées par les boîtes [centre - etendue, centre + etendue]
+    # Hypothèse : 2 * etendue < tailleTuile, donc chaque boîte touche au plus 2 x 2 tuiles (ses quatre coins suffisent)
+    hauteur, largeur = forme[-2:]
+    nbTuilesX = (largeur + tailleTuile - 1) // tailleTuile
+
+    lignes = [np.clip(ys - etendue, 0, hauteur - 1) // tailleTuile, np.clip(ys + etendue, 0, hauteur - 1) // tailleTuile]
+    colonnes = [np.clip(xs - etendue, 0, largeur - 1) // tailleTuile, np.clip(xs + etendue, 0, largeur - 1) // tailleTuile]
+
+    return set(np.unique(np.concatenate([ligne * nbTuilesX + colonne for ligne in lignes for colonne in colonnes])).tolist())
+
+def filtrerParTuiles(filtre, image : np.ndarray, halo : int, nbTravailleurs : int, tailleTuile : int = 512, **parametres) :
+
+    # Application filtre scipy.ndimage (median_filter, gaussian_filter, ...) par tuiles avec halo sur un pool de threads
+    # (scipy.ndimage libère le GIL pendant le calcul) : résultat identique à filtre(image, **parametres) si halo >= rayon du filtre
+    # Dimensions précédant hauteur et largeur (canaux d'une image couleur) : plans filtrés indépendamment, filtre appliqué en 2D
+    # (plans et tuiles forment ensemble la liste des travaux répartis sur le pool)
+
+    if image.ndim == 2 and (nbTravailleurs <= 1 or max(image.shape) <= tailleTuile) : # Image trop petite ou un seul cœur : appel direct
+        return filtre(image, **parametres)
+
+    # Sortie allouée une seule fois, avec type de donnée produit par filtre
+    sortie = np.empty(image.shape, dtype=filtre(image[(0,) * (image.ndim - 2) + (slice(0, 1), slice(0, 1))], **parametres).dtype)
+
+    if nbTravailleurs <= 1 or max(image.shape[-2:]) <= tailleTuile : # Plans entiers (une seule tuile par plan)
+        tuiles = [((slice(None), slice(None)),) * 3]
+    else :
+        tuiles = list(decouperTuiles(image.shape, tailleTuile, halo))
+
+    def filtrerTuile(travail) :
+        plan, (coeur, region, coeurDansRegion) = travail
+        sortie[plan + coeur] = filtre(image[plan + region], **parametres)[coeurDansRegion]
+
+    travaux = [(plan, tuile) for plan in np.ndindex(image.shape[:-2]) for tuile in tuiles]
+
+    if nbTravailleurs <= 1 :
+        for travail in travaux :
+            filtrerTuile(travail)
+    else :
+        with ThreadPoolExecutor(max_workers=nbTravailleurs) as pool :
+            list(pool.map(filtrerTuile, travaux)) # list() propage exceptions des threads
+
+    return sortie
+
+def reduireImage(image : np.ndarray, facteur : int, hauteurBande : int = 1024) :
+
+    # Réduction de image par moyenne de blocs facteur x facteur (bords incomplets ignorés), en float32
+    # Lecture par bandes de lignes : mémoire bornée même si image est un memory map de plusieurs Go
+    # Image couleur (canal, ligne, colonne) : chaque canal réduit séparément
+    if image.ndim > 2 :
+        return np.stack([reduireImage(plan, facteur, hauteurBande) for plan in image])
+
+    hauteur, largeur = image.shape[0] // facteur, image.shape[1] // facteur
+    reduite = np.empty((hauteur, largeur), dtype=np.float32)
+    lignesParBande = max(1, hauteurBande // facteur)
+
+    for debut in range(0, hauteur, lignesParBande) :
+        fin = min(debut + lignesParBande, hauteur)
+        bande = np.asarray(image[debut * facteur : fin * facteur, : largeur * facteur], dtype=np.float32)
+        reduite[debut:fin] = bande.reshape(fin - debut, facteur, largeur, facteur).mean(axis=(1, 3))
+
+    return reduite
+
+def creerFitsMemmap(cheminSortie : str, forme : tuple, dtype = np.float64) :
+
+    from astropy.io import fits # Import différé : seul le mode par tuiles écrit des FITS
+
+    # Création fichier FITS de la taille finale sans allouer les données en mémoire
+    # En-tête écrit seul, puis fichier étendu jusqu'à la taille des données (bloc FITS de 2880 octets)
+    entete = fits.PrimaryHDU(data=np.zeros((1,) * len(forme), dtype=dtype)).header
+    for i, taille in enumerate(reversed(forme)) : # NAXIS1 = largeur (ordre inverse de numpy)
+        entete[f'NAXIS{i + 1}'] = taille
+    entete.tofile(cheminSortie, overwrite=True)
+
+    tailleDonnees = int(np.prod(forme)) * np.dtype(dtype).itemsize
+    tailleDonnees = ((tailleDonnees + 2879) // 2880) * 2880
+
+    with open(cheminSortie, 'rb+') as fichier :
+        fichier.seek(len(entete.tostring()) + tailleDonnees - 1)
+        fichier.write(b'\0')
+
+    # Ouverture en écriture par memory map : les tuiles sont écrites directement dans le fichier
+    return fits.open(cheminSortie, mode='update', memmap=True)
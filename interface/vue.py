@@ -4,14 +4,58 @@
 
 import sys, os
 from PyQt6.QtWidgets import QApplication, QWidget, QDockWidget, QStackedWidget, QHBoxLayout, QVBoxLayout, QMainWindow
-from PyQt6.QtWidgets import QLabel, QPushButton, QSlider, QSpinBox, QFileDialog
-from PyQt6.QtGui import QIcon, QAction, QPixmap
+from PyQt6.QtWidgets import QLabel, QPushButton, QSlider, QSpinBox, QComboBox, QFileDialog
+from PyQt6.QtGui import QIcon, QAction, QActionGroup, QPixmap
 from PyQt6.QtCore import Qt, pyqtSignal
 
+# -------------------- #
+# ---- Constantes ---- #
+# -------------------- #
+
+TAILLE_AFFICHAGE = (500, 400) # (largeur, hauteur) des images affichées
+ZOOM_MAX = 64.0 # Zoom maximal par rapport à image entière
+
 # ----------------- #
 # ---- Classes ---- #
 # ----------------- #
 
+class ImageInteractive(QLabel) :
+
+    # Label image zoomable (molette) et déplaçable (glisser avec bouton gauche)
+    # Positions transmises en fractions de la taille du label : indépendantes de la taille de image affichée
+
+    zoom : pyqtSignal = pyqtSignal(float, float, float) # (facteur, x curseur, y curseur)
+    deplacement : pyqtSignal = pyqtSignal(float, float) # (dx, dy)
+
+    def __init__(self) :
+
+        super().__init__()
+        self.setFixedSize(*TAILLE_AFFICHAGE)
+        self.__positionPrecedente = None # Position curseur pendant glissement
+
+    def wheelEvent(self, event) :
+
+        if event.angleDelta().y() != 0 :
+            position = event.position()
+            self.zoom.emit(1.25 if event.angleDelta().y() > 0 else 0.8, position.x() / self.width(), position.y() / self.height())
+
+    def mousePressEvent(self, event) :
+
+        if event.button() == Qt.MouseButton.LeftButton :
+            self.__positionPrecedente = event.position()
+
+    def mouseMoveEvent(self, event) :
+
+        if self.__positionPrecedente is not None :
+            position = event.position()
+            self.deplacement.emit((position.x() - self.__positionPrecedente.x()) / self.width(),
+                                  (position.y() - self.__positionPrecedente.y()) / self.height())
+            self.__positionPrecedente = position
+
+    def mouseReleaseEvent(self, event) :
+
+        self.__positionPrecedente = None
+
 class Vue(QMainWindow) :
 
     # --------------- #
@@ -49,6 +93,11 @@ class Vue(QMainWindow) :
     # --- Section image sans étoiles --- #
     enregistrementImageSansEtoiles : pyqtSignal = pyqtSignal(str)
     modificationFiltreEtoiles : pyqtSignal = pyqtSignal(int)
+    modificationMoteurFond : pyqtSignal = pyqtSignal(str)
+
+    # --- Affichage images --- #
+    modificationEtirement : pyqtSignal = pyqtSignal(str)
+    modificationFenetreAffichage : pyqtSignal = pyqtSignal(float, float, float) # (u, v, zoom) : voir getFenetreAffichage
 
     # ------------------ #
     # ---- Méthodes ---- #
@@ -70,6 +119,7 @@ class Vue(QMainWindow) :
         # Initialisation menus
         self.menuFichier = barreMenu.addMenu("&Fichier")
         menuOptions = barreMenu.addMenu("&Options")
+        self.menuAffichage = barreMenu.addMenu("&Affichage") # Rempli par setEtirements
 
         # Initialisation sous-menus
 
@@ -102,7 +152,7 @@ class Vue(QMainWindow) :
 
         # -- Image originale
         intituleImageOriginale = QLabel("Image originale")
-        self.imageOriginale = QLabel()
+        self.imageOriginale = ImageInteractive()
         boutonEnregistrementImageOriginale = QPushButton("Enregistrer")
         
         sigmaClippingSliderLabel = QLabel("Sigma Clipping")
@@ -113,7 +163,7 @@ class Vue(QMainWindow) :
 
         # -- Image finale
         intituleImageFinale = QLabel("Image finale")
-        self.imageFinale = QLabel()
+        self.imageFinale = ImageInteractive()
         boutonEnregistrementImageFinale = QPushButton("Enregistrer")
         boutonMiseAJourImages = QPushButton("Mettre à jour les images")
 
@@ -168,7 +218,7 @@ class Vue(QMainWindow) :
 
         # Initialisation éléments
         intituleMasqueEtoilesAdouci = QLabel("Masque d'étoiles adouci")
-        self.masqueEtoilesAdouci = QLabel()
+        self.masqueEtoilesAdouci = ImageInteractive()
         boutonEnregistrementMasqueEtoilesAdouci = QPushButton("Enregistrer")
 
         fwhmSliderLabel = QLabel("fwhm")
@@ -231,7 +281,7 @@ class Vue(QMainWindow) :
 
         # Initialisation éléments
         intituleImageSansEtoiles = QLabel("Image sans étoiles")
-        self.imageSansEtoiles = QLabel()
+        self.imageSansEtoiles = ImageInteractive()
         boutonEnregistrementImageSansEtoiles = QPushButton("Enregistrer")
 
         filtreEtoilesSpinBoxLabel = QLabel("Filtre d'étoiles")
@@ -241,15 +291,21 @@ class Vue(QMainWindow) :
         self.filtreEtoilesSpinBox.setSingleStep(2)
         self.filtreEtoilesSpinBox.setValue(9)
 
+        moteurFondComboBoxLabel = QLabel("Moteur de fond")
+        self.moteurFondComboBox = QComboBox() # Rempli par setMoteursFond
+
         # Placement éléments
         intituleImageSansEtoiles.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.imageSansEtoiles.setAlignment(Qt.AlignmentFlag.AlignCenter)
         filtreEtoilesSpinBoxLabel.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        moteurFondComboBoxLabel.setAlignment(Qt.AlignmentFlag.AlignCenter)
         sectionImageSansEtoilesLayout.addWidget(intituleImageSansEtoiles)
         sectionImageSansEtoilesLayout.addWidget(self.imageSansEtoiles)
         sectionImageSansEtoilesLayout.addWidget(boutonEnregistrementImageSansEtoiles)
         sectionImageSansEtoilesLayout.addWidget(filtreEtoilesSpinBoxLabel)
         sectionImageSansEtoilesLayout.addWidget(self.filtreEtoilesSpinBox)
+        sectionImageSansEtoilesLayout.addWidget(moteurFondComboBoxLabel)
+        sectionImageSansEtoilesLayout.addWidget(self.moteurFondComboBox)
         sectionImageSansEtoilesLayout.addStretch()
 
         # Placement dans fenêtre
@@ -301,6 +357,14 @@ class Vue(QMainWindow) :
 
         boutonEnregistrementImageSansEtoiles.clicked.connect(self.enregistrerImageSansEtoiles)
         self.filtreEtoilesSpinBox.valueChanged.connect(self.modifierFiltreEtoiles)
+        self.moteurFondComboBox.currentIndexChanged.connect(self.modifierMoteurFond)
+
+        # --- Affichage images --- #
+
+        self.reinitialiserFenetreAffichage()
+        for image in (self.imageOriginale, self.masqueEtoilesAdouci, self.imageSansEtoiles, self.imageFinale) :
+            image.zoom.connect(self.zoomerAffichage)
+            image.deplacement.connect(self.deplacerAffichage)
 
     def viderFenetre(self) :
 
@@ -309,6 +373,7 @@ class Vue(QMainWindow) :
         self.masqueEtoilesAdouci.clear()
         self.imageSansEtoiles.clear()
         self.imageFinale.clear()
+        self.reinitialiserFenetreAffichage()
 
         # Affichage sections
         self.widgetCentral.setCurrentIndex(0)
@@ -317,16 +382,17 @@ class Vue(QMainWindow) :
         self.menuFichier.removeAction(self.actionEnregistrerImages)
 
     def remplirFenetre(self, 
-                       imageOriginale : QPixmap, 
-                       masqueEtoilesAdouci : QPixmap, 
-                       imageSansEtoiles : QPixmap, 
-                       imageFinale : QPixmap) :
+                       imageOriginale : QPixmap = None, 
+                       masqueEtoilesAdouci : QPixmap = None, 
+                       imageSansEtoiles : QPixmap = None, 
+                       imageFinale : QPixmap = None) :
         
-        # Maj images
-        self.imageOriginale.setPixmap(imageOriginale.scaled(500, 400))
-        self.masqueEtoilesAdouci.setPixmap(masqueEtoilesAdouci.scaled(500, 400))
-        self.imageSansEtoiles.setPixmap(imageSansEtoiles.scaled(500, 400))
-        self.imageFinale.setPixmap(imageFinale.scaled(500, 400))
+        # Maj images (pixmaps déjà à taille affichage si produites pour fenetre d'affichage : mise à l'échelle sans effet)
+        # Image à None : panneau inchangé
+        for label, pixmap in ((self.imageOriginale, imageOriginale), (self.masqueEtoilesAdouci, masqueEtoilesAdouci),
+                              (self.imageSansEtoiles, imageSansEtoiles), (self.imageFinale, imageFinale)) :
+            if pixmap is not None :
+                label.setPixmap(pixmap.scaled(*TAILLE_AFFICHAGE))
 
         # Affichage sections
         self.widgetCentral.setCurrentIndex(1)
@@ -334,17 +400,72 @@ class Vue(QMainWindow) :
         self.dockImageSansEtoiles.show()
         self.menuFichier.addAction(self.actionEnregistrerImages)
 
+    def getFenetreAffichage(self) :
+
+        # (u, v, zoom) : centre de la région affichée en fractions de largeur et hauteur image, zoom 1 = image entière
+        # Fenêtre commune aux quatre images (même champ)
+        return self.fenetreAffichage
+
+    def reinitialiserFenetreAffichage(self) :
+
+        self.fenetreAffichage = (0.5, 0.5, 1.0)
+
+    def zoomerAffichage(self, facteur : float, x : float, y : float) :
+
+        u, v, zoom = self.fenetreAffichage
+        nouveauZoom = min(max(zoom * facteur, 1.0), ZOOM_MAX)
+
+        # Point de image sous le curseur conservé sous le curseur
+        u += (x - 0.5) * (1 / zoom - 1 / nouveauZoom)
+        v += (y - 0.5) * (1 / zoom - 1 / nouveauZoom)
+        self.setFenetreAffichage(u, v, nouveauZoom)
+
+    def deplacerAffichage(self, dx : float, dy : float) :
+
+        u, v, zoom = self.fenetreAffichage
+        self.setFenetreAffichage(u - dx / zoom, v - dy / zoom, zoom)
+
+    def setFenetreAffichage(self, u : float, v : float, zoom : float) :
+
+        # Correction valeurs invalides : région affichée maintenue dans image
+        zoom = min(max(zoom, 1.0), ZOOM_MAX)
+        u = min(max(u, 0.5 / zoom), 1 - 0.5 / zoom)
+        v = min(max(v, 0.5 / zoom), 1 - 0.5 / zoom)
+
+        if (u, v, zoom) != self.fenetreAffichage :
+            self.fenetreAffichage = (u, v, zoom)
+            self.modificationFenetreAffichage.emit(u, v, zoom)
+
+    def setEtirements(self, etirements : dict) :
+
+        # Étirements d'affichage disponibles : { nom : description affichée } (premier = étirement par défaut)
+        self.menuAffichage.clear()
+        self.groupeEtirements = QActionGroup(self) # Choix exclusif
+        for nom, description in etirements.items() :
+            action = QAction(description, self)
+            action.setCheckable(True)
+            action.setData(nom)
+            self.groupeEtirements.addAction(action)
+            self.menuAffichage.addAction(action)
+        self.groupeEtirements.actions()[0].setChecked(True)
+        self.groupeEtirements.triggered.connect(self.modifierEtirement)
+
+    def modifierEtirement(self, action : QAction) :
+
+        self.modificationEtirement.emit(action.data())
+
     def setEtatChargement(self, enCours: bool):
 
+        # Simple indication : vue jamais bloquée (calcul en arrière-plan, relancé à chaque modification)
         if enCours :
             self.statusBar().showMessage("Génération des images en cours...")
-            self.setEnabled(False)
-            QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
 
         else :
             self.statusBar().clearMessage()
-            self.setEnabled(True)
-            QApplication.restoreOverrideCursor()
+
+    def afficherErreur(self, message : str) :
+
+        self.statusBar().showMessage(f"Erreur : {message}", 10000) # Affichée 10 s
 
     def chargerFichier(self) : 
 
@@ -356,6 +477,13 @@ class Vue(QMainWindow) :
 
     def reinitialiserParametres(self) :
 
+        # Signaux des widgets bloqués : valeurs par défaut affichées sans demande de recalcul
+        # (modèle réinitialisé directement par le contrôleur, qui planifie lui-même un éventuel recalcul)
+        widgets = (self.sigmaClippingSlider, self.fwhmSlider, self.thresholdSlider, self.rayonSlider, self.flouGaussienSlider,
+                   self.filtreEtoilesSpinBox, self.moteurFondComboBox)
+        for widget in widgets :
+            widget.blockSignals(True)
+
         # --- Section centrale --- #
 
         # -- Image originale
@@ -374,6 +502,19 @@ class Vue(QMainWindow) :
 
         self.filtreEtoilesSpinBox.setMinimum(9)
         self.filtreEtoilesSpinBox.setValue(9)
+        self.moteurFondComboBox.setCurrentIndex(0)
+
+        for widget in widgets :
+            widget.blockSignals(False)
+
+    def setMoteursFond(self, moteurs : dict) :
+
+        # Moteurs de fond disponibles : { nom : description affichée } (premier = moteur par défaut)
+        self.moteurFondComboBox.blockSignals(True)
+        self.moteurFondComboBox.clear()
+        for nom, description in moteurs.items() :
+            self.moteurFondComboBox.addItem(description, nom)
+        self.moteurFondComboBox.blockSignals(False)
 
     def signalReinitialiserParametres(self) :
 
@@ -443,6 +584,10 @@ class Vue(QMainWindow) :
 
         self.modificationFiltreEtoiles.emit(self.filtreEtoilesSpinBox.value())
 
+    def modifierMoteurFond(self) :
+
+        self.modificationMoteurFond.emit(self.moteurFondComboBox.currentData())
+
 # -------------- #
 # ---- Main ---- #
 # -------------- #